@@ -111,6 +111,12 @@ setup(
     #   py_modules=["my_module"],
     #
     packages=find_packages(where="src"),  # Required
+    # The calculator lives in top level modules under src/ rather than in a
+    # package, so list them here to install them.
+    py_modules=["bracket", "cache", "cli", "crib", "database", "gcode", "instrument", "interpolate",
+                "lookup", "machine", "machine_table", "mapstore", "material", "operation",
+                "optimizer", "power", "records", "schema", "server", "sqlstore", "sweep", "tool",
+                "watcher"],
     # Specify which Python versions you support. In contrast to the
     # 'Programming Language' classifiers above, 'pip install' will check this
     # and refuse to install the project if the version does not match. See
@@ -122,12 +128,28 @@ setup(
     #
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/discussions/install-requires-vs-requirements/
-    install_requires=["pandas", "numpy", "PyQt5", "odfpy"],  # Optional
+    install_requires=["pandas", "numpy", "PyQt5", "odfpy", "pyyaml"],  # Optional
     # List additional groups of dependencies here (e.g. development
     # dependencies). Users will be able to install these using the "extras"
     # syntax, for example:
     #
     #   $ pip install sampleproject[dev]
+    #
+    # Charts (src/postprocess/plotter.py and the GUI's results chart) need
+    # matplotlib.
+    extras_require={"plot": ["matplotlib"], "parquet": ["pyarrow"], "test": ["pytest"]},
+
+    # To provide executable scripts, use entry points in preference to the
+    # "scripts" keyword. Entry points provide cross-platform support and allow
+    # `pip` to create the appropriate form of executable for the target
+    # platform.
+    #
+    # The headless calculator runs without PyQt5.
+    entry_points={  # Optional
+        "console_scripts": [
+            "vsfeedspeed=cli:main",
+        ],
+    },
 
 
 )
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for loading, lookup, interpolation and the feed calculation.
+
+    python benchmark.py [--sizes 48,1000,100000,1000000] [-o results.json]
+    python benchmark.py --compare old.json new.json
+
+Runs against synthetic databases shaped like the non-metals sheet, from the
+size of the real one up to a million rows, and records:
+
+- cold start: a fresh interpreter importing, loading the cached table,
+  building the index and answering one lookup, with its peak RSS and the
+  part of its memory that isn't shared with other processes
+- the same cold start opening a mapstore file instead
+- index build time
+- single lookup latency, uncached (LRU disabled) and cached
+- batch throughput of feed_speed_batch and calc_batch
+- Operation.calc_feedrate per call
+
+Results are written as JSON with the commit and machine they came from, so
+runs on the same machine can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIZES = [48, 1000, 10000, 100000, 1000000]
+DOCS = [0.0, 0.125, 0.25, 0.5]
+DIAMETERS = np.linspace(0.0625, 1.0, 16)
+BATCH = 100000
+REPEAT = 5
+LOOKUPS = 2000
+
+
+def synthetic_table(rows, seed=0):
+    """
+    A DataFrame with the non-metals columns and about rows rows: every
+    selection has one row per DOC and diameter.
+    """
+    import pandas as pd
+    from lookup import FAMILY, SPECIES, TOOL_MATERIAL, OPERATION, DOC, DIAMETER, FEED, SPEED
+
+    rng = np.random.default_rng(seed)
+    per_leaf = len(DOCS) * len(DIAMETERS)
+    leaves = max(1, -(-rows // per_leaf))
+    leaf = np.repeat(np.arange(leaves), per_leaf)[:rows]
+    n = len(leaf)
+    doc = np.tile(np.repeat(DOCS, len(DIAMETERS)), leaves)[:n]
+    diameter = np.tile(DIAMETERS, leaves * len(DOCS))[:n]
+
+    # spread the leaves over a tree of families, species, tool materials and operations
+    return pd.DataFrame({
+        FAMILY: ["family{}".format(i) for i in leaf % 10],
+        SPECIES: ["species{}".format(i) for i in leaf // 4],
+        TOOL_MATERIAL: np.where(leaf % 2, "carbide", "HSS"),
+        OPERATION: np.where((leaf // 2) % 2, "slotting", "end mill"),
+        DOC: doc,
+        DIAMETER: diameter,
+        FEED: np.round(0.001 + 0.02 * diameter * rng.uniform(0.8, 1.2, n), 4),
+        SPEED: np.round(rng.uniform(100, 1500, n), 1),
+    })
+
+
+def queries(index, count, seed=1):
+    """
+    count random (selection, doc, diameter) queries within the data.
+    """
+    rng = np.random.default_rng(seed)
+    selections = list(index.selections())
+    picks = rng.integers(0, len(selections), count)
+    docs = rng.uniform(0, DOCS[-1], count)
+    diameters = rng.uniform(DIAMETERS[0], DIAMETERS[-1], count)
+    return [(selections[p], d, D) for p, d, D in zip(picks, docs, diameters)]
+
+
+def best_time(fn, repeat=REPEAT):
+    """
+    Fastest of repeat runs of fn, in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def cold_start(path):
+    """
+    Time a fresh interpreter loading the table (a pickle cache, or a
+    mapstore file) and answering one lookup.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, __file__, "--child", path], cwd=HERE,
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    child = json.loads(proc.stdout)
+    child["wall_s"] = wall
+    return child
+
+
+def child(path):
+    """
+    The cold start session, run in its own process by cold_start.
+    """
+    start = time.perf_counter()
+    import database
+    from lookup import LookupIndex
+    from mapstore import MappedStore
+    imported = time.perf_counter()
+    if path.endswith(".vsdb"):
+        index = MappedStore(path)
+        loaded = built = time.perf_counter()
+    else:
+        table = database.read_cache(path)
+        loaded = time.perf_counter()
+        index = LookupIndex(table)
+        built = time.perf_counter()
+    selection = next(index.selections())
+    index.feed_speed(*selection, 0.1, 0.3)
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_s": imported - start,
+        "load_s": loaded - imported,
+        "build_s": built - loaded,
+        "first_lookup_s": done - built,
+        "peak_rss_mb": peak_memory(),
+        "private_mb": private_memory(),
+    }))
+    return 0
+
+
+def peak_memory():
+    """
+    Peak RSS of this process in MB. ru_maxrss carries over the parent's peak
+    through fork and exec on Linux, so VmHWM is used where there is one.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def private_memory():
+    """
+    MB of this process's memory not shared with others (Linux only, else None).
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    kb = sum(int(fields[name].split()[0]) for name in ("Private_Clean", "Private_Dirty"))
+    return kb / 1024.0
+
+
+def run_size(rows, results, workdir):
+    import database
+    from lookup import LookupIndex
+    from mapstore import MappedStore, write_store
+    from operation import Operation, calc_batch
+    from tool import Tool
+    from material import Material
+
+    def record(name, value, unit):
+        results.append({"name": name, "rows": rows, "value": value, "unit": unit})
+        print("{:>9} rows  {:<28} {:12.3f} {}".format(rows, name, value, unit))
+
+    table = synthetic_table(rows)
+    pickle_path = os.path.join(workdir, "table{}.pkl".format(rows))
+    database.write_cache(table, pickle_path)
+
+    cold = cold_start(pickle_path)
+    record("cold_start", 1000 * cold["wall_s"], "ms")
+    record("cold_start_load", 1000 * cold["load_s"], "ms")
+    record("cold_start_build", 1000 * cold["build_s"], "ms")
+    record("peak_rss", cold["peak_rss_mb"], "MB")
+    if cold["private_mb"] is not None:
+        record("private_memory", cold["private_mb"], "MB")
+
+    store_path = os.path.join(workdir, "table{}.vsdb".format(rows))
+    write_store(LookupIndex(table), store_path)
+    cold = cold_start(store_path)
+    record("cold_start_mapped", 1000 * cold["wall_s"], "ms")
+    record("cold_start_mapped_open", 1000 * cold["load_s"], "ms")
+    record("peak_rss_mapped", cold["peak_rss_mb"], "MB")
+    if cold["private_mb"] is not None:
+        record("private_memory_mapped", cold["private_mb"], "MB")
+
+    record("index_build", 1000 * best_time(lambda: LookupIndex(table), repeat=3), "ms")
+
+    uncached = LookupIndex(table, cache_size=0)
+    # big enough that every query hits once warmed up
+    cached = LookupIndex(table, cache_size=LOOKUPS)
+    qs = queries(uncached, LOOKUPS)
+
+    def lookups(index):
+        for selection, doc, diameter in qs:
+            index.feed_speed(*selection, doc, diameter)
+
+    record("lookup_uncached", 1e6 * best_time(lambda: lookups(uncached)) / LOOKUPS, "us")
+    lookups(cached)
+    record("lookup_cached", 1e6 * best_time(lambda: lookups(cached)) / LOOKUPS, "us")
+
+    selection = qs[0][0]
+    rng = np.random.default_rng(2)
+    docs = rng.uniform(0, DOCS[-1], BATCH)
+    diameters = rng.uniform(DIAMETERS[0], DIAMETERS[-1], BATCH)
+    t = best_time(lambda: cached.feed_speed_batch(*selection, docs, diameters))
+    record("feed_speed_batch", BATCH / t / 1e6, "M queries/s")
+    feeds, speeds = cached.feed_speed_batch(*selection, docs, diameters)
+    t = best_time(lambda: calc_batch(diameters, 2, speeds, feeds, diameters, docs))
+    record("calc_batch", BATCH / t / 1e6, "M jobs/s")
+
+    op = Operation(Tool(0.25, 2, "HSS"), Material("wood"))
+    op.f, op.ss = 0.01, 650
+    t = best_time(lambda: [op.calc_feedrate() for _ in range(LOOKUPS)])
+    record("calc_feedrate", 1e6 * t / LOOKUPS, "us")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    """
+    Print new / old for every result in both files.
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(r["name"], r["rows"]): r for r in old["results"]}
+    print("{} -> {}".format(old.get("commit"), new.get("commit")))
+    for r in new["results"]:
+        o = before.get((r["name"], r["rows"]))
+        if o is None or not o["value"]:
+            continue
+        print("{:>9} rows  {:<28} {:12.3f} -> {:12.3f} {:<12} {:6.2f}x".format(
+            r["rows"], r["name"], o["value"], r["value"], r["unit"], r["value"] / o["value"]))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                        help="comma separated table sizes in rows (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child(args.child)
+    if args.compare:
+        return compare(*args.compare)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in (int(s) for s in args.sizes.split(",")):
+            run_size(rows, results, workdir)
+
+    report = {
+        "commit": git_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
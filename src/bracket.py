@@ -0,0 +1,65 @@
+from collections import namedtuple
+
+import numpy as np
+
+# lo, hi: indices of the neighbours in the sorted array
+# weight: position of the query between them, 0 at lo and 1 at hi
+# outside: the query is below the first or above the last value
+Bracket = namedtuple('Bracket', ['lo', 'hi', 'weight', 'outside'])
+
+
+def bracket(xs, x, mode='clamp'):
+    """
+    Find the neighbours of x in the sorted array xs with searchsorted.
+
+    x may be a scalar or an array. An exact match gives lo at the match and
+    a weight of 0, except a match on the last value, which gives the last
+    pair (lo one below it) and a weight of 1. Below the minimum the first
+    pair of values is used, and above the maximum the last pair. With mode
+    'clamp' or 'nan' the weight is clamped to 0..1 there, so the query
+    snaps to the end value. With 'extrapolate' the weight is left free to
+    run past 0 or 1. The outside mask tells the caller which queries fell
+    off the ends. An array with a single value brackets everything with a
+    weight of 0 and nothing outside, since the data doesn't vary along
+    that axis.
+    """
+    xs = np.asarray(xs, dtype=float)
+    x = np.asarray(x, dtype=float)
+    n = len(xs)
+    if n == 0:
+        raise ValueError("cannot bracket in an empty array")
+    if n == 1:
+        zeros = np.zeros(x.shape, dtype=int)
+        return Bracket(zeros, zeros, np.zeros(x.shape), np.zeros(x.shape, dtype=bool))
+
+    outside = (x < xs[0]) | (x > xs[-1])
+    hi = np.clip(np.searchsorted(xs, x, side='right'), 1, n - 1)
+    lo = hi - 1
+    with np.errstate(invalid='ignore'):
+        weight = (x - xs[lo]) / (xs[hi] - xs[lo])
+    if mode != 'extrapolate':
+        weight = np.clip(weight, 0.0, 1.0)
+    return Bracket(lo, hi, weight, outside)
+
+
+def nearest_pair(xs, x):
+    """
+    Return the nearest values at or below and at or above x in sorted xs.
+
+    Queries outside xs clamp to the first or last value.
+    """
+    xs = np.asarray(xs, dtype=float)
+    b = bracket(xs, x)
+    low = np.where(b.weight >= 1, xs[b.hi], xs[b.lo])
+    high = np.where(b.weight <= 0, xs[b.lo], xs[b.hi])
+    if low.ndim == 0:
+        return float(low), float(high)
+    return low, high
+
+
+def find_nearest_low(array, value):
+    return nearest_pair(np.unique(array), value)[0]
+
+
+def find_nearest_high(array, value):
+    return nearest_pair(np.unique(array), value)[1]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Import time budget for the calculation core.
+
+Imports the core modules in a fresh interpreter under `python -X importtime`
+and fails if any heavy GUI, spreadsheet or plotting module gets pulled in, or
+if the imports take longer than the budget.
+
+    python check_importtime.py [--budget-ms 250]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+CORE_MODULES = ["tool", "material", "operation", "machine", "power", "bracket", "interpolate", "lookup",
+                "database", "cli"]
+FORBIDDEN = ["PyQt5", "pandas", "yaml", "matplotlib", "odf"]
+BUDGET_MS = 250
+
+
+def measure(modules):
+    """
+    Import modules in a fresh interpreter, see parse.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    cmd = [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)]
+    proc = subprocess.run(cmd, cwd=here, capture_output=True, text=True, check=True)
+    return parse(proc.stderr, modules)
+
+
+def parse(output, modules):
+    """
+    Return ({module: cumulative import time in us}, total us for modules)
+    from the output of -X importtime.
+
+    A module's cumulative time includes the modules it imports, e.g.
+    operation's includes power and instrument. So the total only adds up
+    the top level imports of modules, and a module that was already pulled
+    in by another (it has no top level line) isn't counted again.
+    """
+    times = {}
+    total = 0
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented two more spaces per level
+        top = len(name) - len(name.lstrip()) == 1
+        name = name.strip()
+        if top and name in modules:
+            total += int(cumulative)
+        times[name] = int(cumulative)
+    return times, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time budget of the calculation core")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    times, total = measure(CORE_MODULES)
+    failed = False
+
+    heavy = sorted(name for name in times if name.split(".")[0] in FORBIDDEN)
+    if heavy:
+        print("Heavy modules imported by the core: {}".format(", ".join(heavy)))
+        failed = True
+
+    total_ms = total / 1000.0
+    print("Core import time: {:.1f} ms (budget {:.0f} ms)".format(total_ms, args.budget_ms))
+    # each including what it imports, so they overlap
+    print("Cumulative per module:")
+    for name in CORE_MODULES:
+        print("  {:<12} {:8.1f} ms".format(name, times.get(name, 0) / 1000.0))
+    if total_ms > args.budget_ms:
+        print("Import time budget exceeded.")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Headless feed and speed calculator.
+
+Runs the same lookup, interpolation and RPM/feed calculation as the GUI
+without importing PyQt5. Either answer a single job from the command line
+or stream a CSV of jobs to an output CSV.
+"""
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+import database
+import instrument
+import interpolate
+import lookup
+from lookup import LookupIndex
+from sqlstore import SQLStore
+from mapstore import MappedStore
+from operation import Operation, calc_batch
+from tool import Tool
+from material import Material
+from machine import Spindle
+from optimizer import optimize
+
+JOB_FIELDS = ['material', 'species', 'tool material', 'operation',
+              'diameter', 'flutes', 'DOC', 'WOC']
+RESULT_FIELDS = ['feed', 'speed', 'rpm', 'feedrate', 'Q']
+CHUNK_SIZE = 4096
+DEFAULT_OPERATION = 'end mill'
+
+
+def parse_float(job, field, default=None):
+    """
+    A number field of a job, or default if it's blank. Raises ValueError
+    naming the field for anything else that isn't a number.
+    """
+    x = job.get(field)
+    if x is None or x == '':
+        return default
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        raise ValueError("{} {!r} is not a number".format(field, x))
+
+
+def calc_jobs(index, jobs, errors=None):
+    """
+    Calculate a list of job dicts (keys from JOB_FIELDS) in one batched pass.
+
+    Returns one dict of RESULT_FIELDS per job. A job without an operation
+    is an end mill job, as in the single job CLI. Jobs whose feed and speed
+    can't be found in the database get blank results.
+
+    A job with a field that isn't a number raises ValueError, or, given an
+    errors list, gets blank results and (job number, message) is appended.
+    """
+    n = len(jobs)
+    diameters = np.empty(n)
+    docs = np.empty(n)
+    flutes = np.empty(n)
+    widths = np.empty(n)
+    groups = {}
+    for i, job in enumerate(jobs):
+        try:
+            diameter = parse_float(job, 'diameter', float('nan'))
+            # the GUI defaults depth of cut to the cutter diameter
+            doc = parse_float(job, 'DOC', diameter)
+            nt = parse_float(job, 'flutes', 1)
+            width = parse_float(job, 'WOC', float('nan'))
+        except ValueError as e:
+            if errors is None:
+                raise
+            errors.append((i, str(e)))
+            diameter = doc = nt = width = float('nan')
+        diameters[i] = diameter
+        docs[i] = doc
+        flutes[i] = nt
+        widths[i] = width
+        key = (job.get('material'), job.get('species'), job.get('tool material'),
+               job.get('operation') or DEFAULT_OPERATION)
+        groups.setdefault(key, []).append(i)
+
+    # interpolate every job for the same selection at once
+    feeds = np.empty(n)
+    speeds = np.empty(n)
+    for key, rows in groups.items():
+        feeds[rows], speeds[rows] = index.feed_speed_batch(*key, docs[rows], diameters[rows])
+
+    N, fm, Q = calc_batch(diameters, flutes, speeds, feeds, widths, docs)
+
+    results = []
+    for i in range(n):
+        if not math.isfinite(N[i]) or math.isnan(fm[i]):
+            results.append(dict.fromkeys(RESULT_FIELDS, ''))
+            continue
+        results.append({
+            'feed': float(feeds[i]),
+            'speed': float(speeds[i]),
+            'rpm': int(N[i]),
+            'feedrate': float(fm[i]),
+            'Q': '' if math.isnan(Q[i]) else round(float(Q[i]), 4),
+        })
+    return results
+
+
+def run_batch(index, infile, outfile, chunk_size=CHUNK_SIZE, errors=None):
+    """
+    Stream jobs from infile to outfile, chunk_size rows at a time.
+
+    A row with a value that isn't a number is reported on stderr with its
+    line number and written with blank results, and the run goes on.
+    (line, message) of each is appended to errors, if given.
+    """
+    reader = csv.DictReader(infile)
+    fieldnames = list(reader.fieldnames or JOB_FIELDS)
+    fieldnames += [f for f in RESULT_FIELDS if f not in fieldnames]
+    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+    writer.writeheader()
+
+    if errors is None:
+        errors = []
+    count = 0
+    chunk = []
+    lines = []
+    for row in reader:
+        chunk.append(row)
+        lines.append(reader.line_num)
+        if len(chunk) >= chunk_size:
+            count += write_chunk(index, writer, chunk, lines, errors)
+            chunk = []
+            lines = []
+    if chunk:
+        count += write_chunk(index, writer, chunk, lines, errors)
+    return count
+
+
+def write_chunk(index, writer, chunk, lines, errors):
+    bad = []
+    results = calc_jobs(index, chunk, bad)
+    for i, message in bad:
+        print("line {}: {}".format(lines[i], message), file=sys.stderr)
+        errors.append((lines[i], message))
+    for row, result in zip(chunk, results):
+        row.update(result)
+        writer.writerow(row)
+    return len(chunk)
+
+
+def add_database_arguments(parser):
+    """
+    Options choosing and tuning the feed and speed database, see load_index.
+    """
+    parser.add_argument("--database", default=database.DATABASE_PATH,
+                        help="feed and speed spreadsheet (default: %(default)s)")
+    parser.add_argument("--db", metavar="SQLITE",
+                        help="use an SQLite database made by sqlstore.py instead of the spreadsheet")
+    parser.add_argument("--map", metavar="FILE",
+                        help="use a memory-mapped database made by mapstore.py instead of the spreadsheet")
+    parser.add_argument("--sheet", default="non-metals", help="sheet to read (default: %(default)s)")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="re-read the spreadsheet and regenerate the database cache")
+    parser.add_argument("--cache-size", type=int, default=lookup.CACHE_SIZE,
+                        help="number of lookups to memoize, 0 to disable (default: %(default)s)")
+    parser.add_argument("--outside", choices=interpolate.MODES, default='clamp',
+                        help="how to handle DOCs and diameters outside the data (default: %(default)s)")
+
+
+def load_index(args):
+    if args.map:
+        return MappedStore(args.map, cache_size=args.cache_size, mode=args.outside)
+    if args.db:
+        return SQLStore(args.db, cache_size=args.cache_size, mode=args.outside)
+    table = database.load_table(args.database, sheet_name=args.sheet, rebuild=args.rebuild_cache)
+    return LookupIndex(table, cache_size=args.cache_size, mode=args.outside)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vsfeedspeed", description=__doc__.strip().splitlines()[0])
+    add_database_arguments(parser)
+
+    job = parser.add_argument_group("single job")
+    job.add_argument("--material", help="workpiece material family, e.g. wood")
+    job.add_argument("--species", help="workpiece material species, e.g. MDF")
+    job.add_argument("--tool-material", help="e.g. HSS or carbide")
+    job.add_argument("--operation", default=DEFAULT_OPERATION, help="(default: %(default)s)")
+    job.add_argument("--diameter", type=float, help="cutter diameter (in)")
+    job.add_argument("--flutes", type=float, default=1, help="number of teeth (default: %(default)s)")
+    job.add_argument("--doc", type=float, help="depth of cut (in), defaults to the diameter")
+    job.add_argument("--woc", type=float, help="width of cut (in)")
+
+    opt = parser.add_argument_group("optimize",
+                                    "search DOC, WOC and RPM for the highest removal rate the spindle allows")
+    opt.add_argument("--optimize", action="store_true")
+    opt.add_argument("--max-rpm", type=float, help="spindle max RPM")
+    opt.add_argument("--hp", type=float, default=0, help="spindle horsepower")
+    opt.add_argument("--efficiency", type=float, default=1.0,
+                     help="machine tool efficiency factor (default: %(default)s)")
+    opt.add_argument("--hardness", type=float, default=1.0, help="workpiece Brinell hardness")
+
+    batch = parser.add_argument_group("batch")
+    batch.add_argument("--batch", metavar="CSV",
+                       help="input CSV with columns: " + ", ".join(JOB_FIELDS) + " ('-' for stdin)")
+    batch.add_argument("-o", "--output", default="-", help="output CSV (default: stdout)")
+
+    diag = parser.add_argument_group("diagnostics")
+    diag.add_argument("-v", "--verbose", action="count", default=0,
+                      help="log more, -vv also logs every pipeline stage's timing")
+    diag.add_argument("--metrics", action="store_true",
+                      help="print the time and rows of each pipeline stage to stderr")
+    diag.add_argument("--profile", metavar="FILE",
+                      help="write a cProfile of the run to FILE (view with pstats or snakeviz)")
+    return parser
+
+
+def open_csv(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, newline='')
+
+
+def run_optimize(index, args):
+    if args.max_rpm is None:
+        print("--optimize needs --max-rpm", file=sys.stderr)
+        return 2
+
+    tool = Tool(args.diameter, args.flutes, args.tool_material)
+    material = Material(args.material)
+    material.species = args.species
+    material.hardness = args.hardness
+    operation = Operation(tool, material)
+    operation.operation = args.operation
+    spindle = Spindle()
+    spindle.max_rpm = args.max_rpm
+    spindle.HP = args.hp
+    spindle.E = args.efficiency
+
+    best = optimize(index, tool, material, operation, spindle)
+    if best is None:
+        print("No feasible DOC, WOC and RPM for this selection.", file=sys.stderr)
+        return 1
+
+    print("DOC: {:.4f} in, WOC: {:.4f} in".format(best.doc, best.w))
+    print("Speed: {} RPM, Feedrate: {} in/min, Chipload: {} in/tooth".format(best.N, best.fm, best.f))
+    print("Removal rate: {:.4f} in^3/min".format(best.Q))
+    if not math.isnan(best.Pm):
+        print("Power: {:.2f} HP ({:.0f}% of spindle)".format(best.Pm, best.percent_power))
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    instrument.setup_logging(args.verbose)
+    metrics = None
+    if args.metrics or args.verbose > 1:
+        metrics = instrument.enable()
+    try:
+        if args.profile:
+            return instrument.profile(run, args.profile, parser, args)
+        return run(parser, args)
+    finally:
+        if args.metrics:
+            print(metrics.report(), file=sys.stderr)
+        if metrics is not None:
+            instrument.disable()
+
+
+def run(parser, args):
+    index = load_index(args)
+
+    if args.batch:
+        infile = open_csv(args.batch, 'r')
+        outfile = open_csv(args.output, 'w')
+        errors = []
+        try:
+            run_batch(index, infile, outfile, errors=errors)
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+            if outfile is not sys.stdout:
+                outfile.close()
+        return 1 if errors else 0
+
+    if args.material is None or args.species is None or args.tool_material is None \
+            or args.diameter is None:
+        parser.error("--material, --species, --tool-material and --diameter are required without --batch")
+
+    if args.optimize:
+        return run_optimize(index, args)
+
+    job = {
+        'material': args.material,
+        'species': args.species,
+        'tool material': args.tool_material,
+        'operation': args.operation,
+        'diameter': args.diameter,
+        'flutes': args.flutes,
+        'DOC': args.doc,
+        'WOC': args.woc,
+    }
+    result = calc_jobs(index, [job])[0]
+    if result['rpm'] == '':
+        print("No feed and speed found for this selection.", file=sys.stderr)
+        return 1
+
+    print("Chipload: {} in/tooth, Surface speed: {} sfm".format(result['feed'], result['speed']))
+    print("Speed: {} RPM, Feedrate: {} in/min".format(result['rpm'], result['feedrate']))
+    if result['Q'] != '':
+        print("Removal rate: {} in^3/min".format(result['Q']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import json
+import os
+
+from tool import Tool
+
+CRIB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tool_crib.json")
+
+
+class ToolCrib():
+    """
+    A library of Tool definitions saved as JSON.
+    """
+    def __init__(self, path=CRIB_PATH):
+        self.path = path
+        self.tools = []
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        self.tools = [Tool.from_dict(d) for d in data.get("tools", [])]
+        return self
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tools": [t.to_dict() for t in self.tools]}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def find(self, name):
+        for tool in self.tools:
+            if tool.name == name:
+                return tool
+        return None
+
+    def add(self, tool):
+        """
+        Add a tool, replacing any tool with the same name.
+        """
+        self.remove(tool.name)
+        self.tools.append(tool)
+
+    def remove(self, name):
+        self.tools = [t for t in self.tools if t.name != name]
+
+    def __len__(self):
+        return len(self.tools)
+
+    def __iter__(self):
+        return iter(self.tools)
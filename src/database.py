@@ -0,0 +1,143 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+import instrument
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DATABASE_PATH = os.path.join(DATA_DIR, "feed_speed_database.ods")
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+
+
+def file_signature(path):
+    """
+    Return (mtime, size) of a file, the cheap half of the cache key.
+    """
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_paths(path, sheet_name, cache_dir=CACHE_DIR):
+    """
+    Return the pickle and metadata paths caching a sheet of path. They're
+    keyed on the full path, so spreadsheets with the same name in different
+    directories don't share (and keep replacing) one cache entry.
+    """
+    base = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    stem = os.path.join(cache_dir, "{}-{}.{}".format(base, key, sheet_name))
+    return stem + ".pkl", stem + ".json"
+
+
+def read_ods(path, sheet_name):
+    import pandas as pd
+    return pd.read_excel(path, engine="odf", sheet_name=sheet_name)
+
+
+def load_table(path=DATABASE_PATH, sheet_name='non-metals', rebuild=False, cache_dir=CACHE_DIR):
+    """
+    Load a sheet of the feed and speed database.
+
+    The parsed sheet is kept in a pickle next to the spreadsheet and reused
+    until the spreadsheet changes. The mtime and size are checked first; the
+    content hash is only computed when those differ, so an unchanged file
+    never has to be read.
+    """
+    with instrument.stage('load') as st:
+        df = _load_table(path, sheet_name, rebuild, cache_dir)
+        st.rows = len(df)
+    return df
+
+
+def _load_table(path, sheet_name, rebuild, cache_dir):
+    data_path, meta_path = cache_paths(path, sheet_name, cache_dir)
+    mtime, size = file_signature(path)
+
+    meta = None
+    if not rebuild:
+        meta = read_meta(meta_path)
+
+    if meta and os.path.exists(data_path):
+        if meta["mtime"] == mtime and meta["size"] == size:
+            return read_cache(data_path)
+
+        digest = file_hash(path)
+        if meta["sha1"] == digest:
+            # touched but not edited, refresh the cheap key
+            try:
+                write_meta(meta_path, mtime, size, digest)
+            except OSError as e:
+                log.warning("couldn't update the cache of %s: %s", path, e)
+            return read_cache(data_path)
+    else:
+        digest = file_hash(path)
+
+    log.info("parsing %s sheet %s", path, sheet_name)
+    df = read_ods(path, sheet_name)
+    try:
+        write_cache(df, data_path)
+        write_meta(meta_path, mtime, size, digest)
+    except OSError as e:
+        # a read-only or full disk only costs the next start a re-parse
+        log.warning("couldn't cache %s: %s", path, e)
+    return df
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(meta_path, mtime, size, digest):
+    with replacing(meta_path, "w") as f:
+        json.dump({"mtime": mtime, "size": size, "sha1": digest}, f)
+
+
+def read_cache(data_path):
+    with open(data_path, "rb") as f:
+        return pickle.load(f)
+
+
+def write_cache(df, data_path):
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    with replacing(data_path, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@contextlib.contextmanager
+def replacing(path, mode):
+    """
+    Open a new temporary file next to path, and rename it over path once
+    written, so a crash never leaves a half written file behind. Each
+    writer gets its own temporary file, so two instances writing the same
+    cache at once don't clobber each other.
+    """
+    f = tempfile.NamedTemporaryFile(mode, dir=os.path.dirname(path), prefix=os.path.basename(path),
+                                    suffix=".tmp", delete=False)
+    try:
+        with f:
+            yield f
+        os.replace(f.name, path)
+    except BaseException:
+        try:
+            os.unlink(f.name)
+        except OSError:
+            pass
+        raise
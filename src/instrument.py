@@ -0,0 +1,125 @@
+"""
+Per-stage timings and row counts for the calculation pipeline.
+
+    with instrument.stage('interpolate', rows=len(docs)):
+        ...
+
+Nothing is recorded until a sink is installed with enable(). Until then
+stage() hands back one shared object whose __enter__ and __exit__ do
+nothing, so leaving the calls in hot paths costs a function call and no
+allocation or clock reads.
+
+Stage names used across the code: load, filter, bracket, interpolate,
+calc_rpm, calc_feed, ui_update, request (a server request).
+"""
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+sink = None
+
+
+class NullStage():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage():
+    """
+    Times a block. rows may be set inside the block once it's known.
+    """
+    def __init__(self, sink, name, rows):
+        self.sink = sink
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.sink.record(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+class Metrics():
+    """
+    Sink that totals the calls, time and rows of each stage, and logs
+    every stage at DEBUG.
+    """
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, name, seconds, rows=0):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = [0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += rows or 0
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s: %.3f ms, %s rows", name, 1000 * seconds, rows)
+
+    def to_dict(self):
+        return {name: {"calls": calls, "total_ms": round(1000 * total, 3), "rows": rows}
+                for name, (calls, total, rows) in self.stages.items()}
+
+    def report(self):
+        lines = ["{:<14} {:>8} {:>12} {:>10}".format("stage", "calls", "total ms", "rows")]
+        for name, (calls, total, rows) in sorted(self.stages.items(), key=lambda kv: -kv[1][1]):
+            lines.append("{:<14} {:>8} {:>12.3f} {:>10}".format(name, calls, 1000 * total, rows))
+        return "\n".join(lines)
+
+
+def enable(metrics=None):
+    """
+    Start recording into metrics (a new Metrics by default). Returns it.
+    """
+    global sink
+    sink = metrics if metrics is not None else Metrics()
+    return sink
+
+
+def disable():
+    global sink
+    sink = None
+
+
+def stage(name, rows=0):
+    if sink is None:
+        return NULL_STAGE
+    return Stage(sink, name, rows)
+
+
+def setup_logging(verbose=0):
+    """
+    Log warnings by default, INFO with -v and DEBUG with -vv, to stderr.
+    """
+    level = logging.WARNING
+    if verbose == 1:
+        level = logging.INFO
+    elif verbose and verbose > 1:
+        level = logging.DEBUG
+    logging.basicConfig(level=level, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+
+def profile(fn, path, *args, **kwargs):
+    """
+    Run fn under cProfile and write the stats to path, for pstats,
+    snakeviz, or flameprof to turn into a flame graph. Returns fn's result.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        log.info("profile written to %s", path)
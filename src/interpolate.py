@@ -0,0 +1,85 @@
+import numpy as np
+import instrument
+from bracket import bracket
+
+# What to do with queries outside the data:
+#   clamp       - use the nearest edge of the grid
+#   extrapolate - extend the edge cells linearly
+#   nan         - return NaN
+MODES = ('clamp', 'extrapolate', 'nan')
+
+
+class Grid():
+    """
+    Feed and speed on a regular DOC x cutter diameter grid.
+
+    Built from the per-DOC rows of a Leaf. Each DOC row is resampled onto
+    the union of all diameters, so a query can be evaluated bilinearly in
+    both DOC and diameter at once. A DOC row is only interpolated between
+    its own smallest and largest diameter; it isn't held flat past them
+    (a vendor row for one cutter says nothing about other cutters). The
+    rest of each diameter column is filled along the DOC axis from the
+    rows that do cover that diameter, holding the end values.
+    """
+    def __init__(self, docs, diameters, feeds, speeds):
+        self.docs = np.asarray(docs, dtype=float)
+        self.diameters = np.unique(np.concatenate(diameters))
+
+        shape = (len(self.docs), len(self.diameters))
+        self.feeds = np.empty(shape)
+        self.speeds = np.empty(shape)
+        for i in range(len(self.docs)):
+            inside = (self.diameters >= diameters[i][0]) & (self.diameters <= diameters[i][-1])
+            self.feeds[i] = np.where(inside, np.interp(self.diameters, diameters[i], feeds[i]), np.nan)
+            self.speeds[i] = np.where(inside, np.interp(self.diameters, diameters[i], speeds[i]), np.nan)
+
+        # every diameter comes from some row, so each column has a value to fill from
+        for j in range(len(self.diameters)):
+            known = ~np.isnan(self.feeds[:, j])
+            if not known.all():
+                self.feeds[:, j] = np.interp(self.docs, self.docs[known], self.feeds[known, j])
+                self.speeds[:, j] = np.interp(self.docs, self.docs[known], self.speeds[known, j])
+
+    @classmethod
+    def from_arrays(cls, docs, diameters, feeds, speeds):
+        """
+        A Grid from already resampled arrays (feeds and speeds shaped
+        docs x diameters), used as is, e.g. views of a memory-mapped file.
+        """
+        grid = cls.__new__(cls)
+        grid.docs = docs
+        grid.diameters = diameters
+        grid.feeds = feeds
+        grid.speeds = speeds
+        return grid
+
+    def evaluate(self, doc, diameter, mode='clamp'):
+        """
+        Return (feed, speed) at the given DOCs and diameters.
+
+        Scalars give scalars, arrays are broadcast against each other.
+        """
+        doc, diameter = np.broadcast_arrays(np.asarray(doc, dtype=float),
+                                            np.asarray(diameter, dtype=float))
+        with instrument.stage('bracket', doc.size):
+            i0, i1, u, doc_out = bracket(self.docs, doc, mode)
+            j0, j1, v, diam_out = bracket(self.diameters, diameter, mode)
+
+        with instrument.stage('interpolate', doc.size):
+            feed = bilinear(self.feeds, i0, i1, u, j0, j1, v)
+            speed = bilinear(self.speeds, i0, i1, u, j0, j1, v)
+
+        if mode == 'nan':
+            outside = doc_out | diam_out
+            feed = np.where(outside, np.nan, feed)
+            speed = np.where(outside, np.nan, speed)
+
+        if feed.ndim == 0:
+            return float(feed), float(speed)
+        return feed, speed
+
+
+def bilinear(values, i0, i1, u, j0, j1, v):
+    top = values[i0, j0] * (1 - v) + values[i0, j1] * v
+    bottom = values[i1, j0] * (1 - v) + values[i1, j1] * v
+    return top * (1 - u) + bottom * u
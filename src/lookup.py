@@ -0,0 +1,276 @@
+import math
+import numpy as np
+import instrument
+from cache import LRUCache
+from interpolate import Grid
+from bracket import nearest_pair
+
+FAMILY = 'Material Family'
+SPECIES = 'material species'
+TOOL_MATERIAL = 'Tool Material'
+OPERATION = 'Operation'
+DOC = 'DOC'
+DIAMETER = 'Cutter Diameter'
+FEED = 'Feed'
+SPEED = 'Speed'
+
+COLUMNS = [FAMILY, SPECIES, TOOL_MATERIAL, OPERATION, DOC, DIAMETER, FEED, SPEED]
+
+CACHE_SIZE = 256
+_MISSING = object()
+
+
+class Leaf():
+    """
+    All rows for one (family, species, tool material, operation).
+
+    DOCs are kept in a sorted array, and each DOC holds its own sorted
+    diameter array with the matching feeds and speeds.
+
+    Rows with a DOC of None (0 or blank in the sheets) apply at any DOC.
+    They are only used when the selection has no rows for real DOCs, never
+    mixed into the DOC axis with them; any_doc says which rows are used.
+    """
+    def __init__(self, rows):
+        # kept so a rebuild can tell whether this leaf's data changed
+        self.source = rows
+        used = [row for row in rows if not is_any_doc(row[0])]
+        self.any_doc = not used
+        if self.any_doc:
+            # a single DOC, so the grid is the same at every depth
+            used = [(0.0,) + tuple(row[1:]) for row in rows]
+
+        by_doc = {}
+        for doc, diameter, feed, speed in used:
+            # first row wins, as drop_duplicates did
+            by_doc.setdefault(doc, {}).setdefault(diameter, (feed, speed))
+
+        self.docs = np.array(sorted(by_doc), dtype=float)
+        self.diameters = []
+        self.feeds = []
+        self.speeds = []
+        for doc in self.docs:
+            entries = sorted(by_doc[doc].items())
+            self.diameters.append(np.array([d for d, _ in entries], dtype=float))
+            self.feeds.append(np.array([fs[0] for _, fs in entries], dtype=float))
+            self.speeds.append(np.array([fs[1] for _, fs in entries], dtype=float))
+
+        self.grid = Grid(self.docs, self.diameters, self.feeds, self.speeds)
+
+    def rows(self, doc, diameter):
+        """
+        Return the (doc, diameter, feed, speed) rows bracketing a query.
+        doc is None for rows that apply at any DOC.
+        """
+        wanted_docs = nearest_pair(self.docs, doc)
+        doc_idx = [i for i, d in enumerate(self.docs) if d in wanted_docs]
+
+        diams = np.unique(np.concatenate([self.diameters[i] for i in doc_idx]))
+        wanted = nearest_pair(diams, diameter)
+
+        rows = []
+        for i in doc_idx:
+            for j, d in enumerate(self.diameters[i]):
+                if d in wanted:
+                    rows.append((None if self.any_doc else float(self.docs[i]), float(d),
+                                 float(self.feeds[i][j]), float(self.speeds[i][j])))
+        return rows
+
+
+class ReadOnlyIndex():
+    """
+    The queries of a feed and speed index, over a tree of
+
+    family -> species -> tool material -> operation -> Leaf
+
+    Subclasses fill the tree (LookupIndex from a DataFrame) or override
+    leaf and the listing methods to read from a store (SQLStore, MappedStore).
+
+    Resolved feeds and speeds are memoized in an LRU cache of cache_size
+    entries. mode sets how queries outside the data are handled, see
+    interpolate.MODES.
+    """
+    def __init__(self, cache_size=CACHE_SIZE, mode='clamp'):
+        self.tree = {}
+        self.cache = LRUCache(cache_size)
+        self.mode = mode
+
+    def close(self):
+        """
+        Release any files the index holds. It can't be used afterwards.
+        """
+
+    def families(self):
+        return list(self.tree)
+
+    def selections(self):
+        """
+        Iterate over every (family, species, tool material, operation).
+        """
+        for family, species_nodes in self.tree.items():
+            for species, tool_nodes in species_nodes.items():
+                for tool_material, op_nodes in tool_nodes.items():
+                    for operation in op_nodes:
+                        yield family, species, tool_material, operation
+
+    def species(self, family):
+        return list(self.tree.get(family, {}))
+
+    def tool_materials(self, family, species=None):
+        found = []
+        for s in self._species_nodes(family, species):
+            for tool_material in s:
+                if tool_material not in found:
+                    found.append(tool_material)
+        return found
+
+    def operations(self, family, species=None, tool_material=None):
+        found = []
+        for s in self._species_nodes(family, species):
+            for tm, ops in s.items():
+                if tool_material is not None and tm != tool_material:
+                    continue
+                for op in ops:
+                    if op not in found:
+                        found.append(op)
+        return found
+
+    def _species_nodes(self, family, species):
+        node = self.tree.get(family, {})
+        if species is None:
+            return list(node.values())
+        if species in node:
+            return [node[species]]
+        return []
+
+    def leaf(self, family, species, tool_material, operation):
+        try:
+            return self.tree[family][species][tool_material][operation]
+        except KeyError:
+            return None
+
+    def rows(self, family, species, tool_material, operation, doc, diameter):
+        leaf = self.leaf(family, species, tool_material, operation)
+        if leaf is None or doc is None or diameter is None:
+            return []
+        return leaf.rows(doc, diameter)
+
+    def feed_speed(self, family, species, tool_material, operation, doc, diameter):
+        """
+        Return the (feed, speed) for a query, or None if it can't be resolved.
+        """
+        key = query_key(family, species, tool_material, operation, doc, diameter)
+        result = self.cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = self._feed_speed(family, species, tool_material, operation, doc, diameter)
+            self.cache.put(key, result)
+        return result
+
+    def _feed_speed(self, family, species, tool_material, operation, doc, diameter):
+        with instrument.stage('filter', 1):
+            leaf = self.leaf(family, species, tool_material, operation)
+        if leaf is None or doc is None or diameter is None:
+            return None
+
+        feed, speed = leaf.grid.evaluate(doc, diameter, self.mode)
+        if np.isnan(feed) or np.isnan(speed):
+            return None
+        return round(feed, 4), round(speed, 4)
+
+    def feed_speed_batch(self, family, species, tool_material, operation, docs, diameters):
+        """
+        Return (feed, speed) arrays for many DOCs and diameters of one
+        selection. Unresolvable entries are NaN.
+        """
+        docs, diameters = np.broadcast_arrays(np.asarray(docs, dtype=float),
+                                              np.asarray(diameters, dtype=float))
+        with instrument.stage('filter', docs.size):
+            leaf = self.leaf(family, species, tool_material, operation)
+        if leaf is None:
+            nans = np.full(docs.shape, np.nan)
+            return nans, nans.copy()
+
+        feed, speed = leaf.grid.evaluate(docs, diameters, self.mode)
+        return np.round(feed, 4), np.round(speed, 4)
+
+
+class LookupIndex(ReadOnlyIndex):
+    """
+    Hierarchical index over the feed and speed table, built once at load.
+
+    The cache is emptied whenever the index is rebuilt. Given a previous
+    index, leaves whose rows are unchanged are taken from it instead of
+    being rebuilt, see build.
+    """
+    def __init__(self, df=None, cache_size=CACHE_SIZE, mode='clamp', previous=None):
+        ReadOnlyIndex.__init__(self, cache_size=cache_size, mode=mode)
+        self.rebuilt = 0
+        if df is not None:
+            self.build(df, previous)
+
+    def build(self, df, previous=None):
+        """
+        Index the rows of df. With a previous index (e.g. before the
+        spreadsheet was edited), only selections whose rows changed get a
+        new Leaf; rebuilt counts them.
+        """
+        with instrument.stage('index', len(df)):
+            self._build(df, previous)
+
+    def _build(self, df, previous):
+        groups = {}
+        for family, species, tool_material, operation, doc, diameter, feed, speed in \
+                df[COLUMNS].itertuples(index=False, name=None):
+            if is_missing(feed) or is_missing(speed):
+                continue
+            key = (family, species, tool_material, operation)
+            row = (doc_value(doc), to_float(diameter), float(feed), float(speed))
+            groups.setdefault(key, []).append(row)
+
+        tree = {}
+        self.rebuilt = 0
+        for (family, species, tool_material, operation), rows in groups.items():
+            node = tree.setdefault(family, {}).setdefault(species, {}).setdefault(tool_material, {})
+            leaf = None
+            if previous is not None:
+                leaf = previous.leaf(family, species, tool_material, operation)
+            if leaf is None or leaf.source != rows:
+                leaf = Leaf(rows)
+                self.rebuilt += 1
+            node[operation] = leaf
+        self.tree = tree
+        self.cache.clear()
+
+
+def query_key(family, species, tool_material, operation, doc, diameter):
+    """
+    Normalize a query so that e.g. 0.25 and 0.2500000001 share a cache entry.
+    """
+    if doc is not None:
+        doc = round(float(doc), 6)
+    if diameter is not None:
+        diameter = round(float(diameter), 6)
+    return (family, species, tool_material, operation, doc, diameter)
+
+
+def is_missing(x):
+    return x is None or (isinstance(x, float) and math.isnan(x))
+
+
+def is_any_doc(doc):
+    return doc is None or doc == 0 or (isinstance(doc, float) and math.isnan(doc))
+
+
+def doc_value(doc):
+    """
+    A DOC as a float, or None for 0 or blank, which mean any DOC.
+    """
+    if is_missing(doc) or is_any_doc(doc):
+        return None
+    return float(doc)
+
+
+def to_float(x):
+    if is_missing(x):
+        return 0.0
+    return float(x)
@@ -1,3 +1,9 @@
+import json
+import os
+
+MACHINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "machines.json")
+
+
 class Spindle():
     def __init__(self):
         self.max_rpm = 0
@@ -5,3 +11,49 @@ class Spindle():
         self.Pm = 0 # Power at motor
         self.E = 1.0 # Machine tool efficiency factor
         self.Kp = 1.0 # Power constant
+
+    def to_dict(self):
+        return {"max_rpm": self.max_rpm, "HP": self.HP, "E": self.E}
+
+    @classmethod
+    def from_dict(cls, d):
+        spindle = cls()
+        spindle.max_rpm = d.get("max_rpm", spindle.max_rpm)
+        spindle.HP = d.get("HP", spindle.HP)
+        spindle.E = d.get("E", spindle.E)
+        return spindle
+
+
+class Machine():
+    """
+    A named machine profile.
+    """
+    def __init__(self, name, spindle=None):
+        self.name = name
+        self.spindle = spindle if spindle is not None else Spindle()
+
+    def to_dict(self):
+        return {"name": self.name, "spindle": self.spindle.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], Spindle.from_dict(d.get("spindle", {})))
+
+
+def load_machines(path=MACHINES_PATH):
+    """
+    Return the saved machine profiles, or an empty list if there are none.
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [Machine.from_dict(d) for d in data.get("machines", [])]
+
+
+def save_machines(machines, path=MACHINES_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"machines": [m.to_dict() for m in machines]}, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,112 @@
+import numpy as np
+
+from tool import Tool
+from operation import calc_batch, calc_power_batch
+from power import get_power_table
+
+# common router bits, used when no other tools are given
+DEFAULT_TOOLS = [Tool(d, n, m, '{} in {} flute {}'.format(d, n, m))
+                 for m in ("HSS", "carbide")
+                 for d in (0.125, 0.25, 0.375, 0.5)
+                 for n in (1, 2, 3)]
+
+KEY_COLUMNS = ['family', 'species', 'tool_material', 'operation']
+COLUMNS = KEY_COLUMNS + ['name', 'D', 'nt', 'doc', 'woc', 'f', 'ss', 'N', 'fm', 'Q', 'Pm',
+                         'percent_power']
+TEXT_COLUMNS = KEY_COLUMNS + ['name']
+
+
+class MachineTable():
+    """
+    Feed, speed and power for every selection in the index and every tool
+    (normally the tool crib), precomputed for one spindle. Each selection's
+    tools are evaluated in one batched pass.
+
+    Each tool is run at a full slot (DOC and WOC equal to its diameter).
+    RPM is capped at the spindle's max_rpm, keeping the database chipload,
+    so the feedrate drops with it. Columns are kept as arrays, see COLUMNS.
+    Rows are keyed on the tool's number, its index in tools (the crib), as
+    tools may share a diameter and flute count.
+    """
+    def __init__(self, index, spindle, tools=None, hardness=0):
+        self.spindle = spindle
+        self.hardness = hardness
+        self.columns = {}
+        self.tool_numbers = np.empty(0, dtype=int)
+        self.keys = {}
+        self.tools = tools if tools is not None else DEFAULT_TOOLS
+        self.build(index, self.tools, hardness)
+
+    def build(self, index, tools, hardness):
+        power_table = get_power_table()
+        parts = {name: [] for name in COLUMNS}
+        numbers = []
+
+        kp_cache = {}
+        for family, species, tool_material, operation in index.selections():
+            matching = [i for i, t in enumerate(tools) if t.material in (None, tool_material) and t.D]
+            if not matching:
+                continue
+            if (family, species) not in kp_cache:
+                kp_cache[family, species] = float(power_table.kp(power_table.find(species, family), hardness))
+            Kp = kp_cache[family, species]
+
+            names = np.array([tools[i].name for i in matching], dtype=object)
+            D = np.array([tools[i].D for i in matching], dtype=float)
+            nt = np.array([tools[i].nt for i in matching], dtype=float)
+            f, ss = index.feed_speed_batch(family, species, tool_material, operation, D, D)
+            N, fm, _ = calc_batch(D, nt, ss, f, max_rpm=self.spindle.max_rpm)
+            Q, Pm, percent = calc_power_batch(fm, D, D, Kp, self.spindle.E,
+                                              self.spindle.HP or None)
+
+            n = len(D)
+            for name, value in (('family', family), ('species', species),
+                                ('tool_material', tool_material), ('operation', operation)):
+                parts[name].append(np.full(n, value, dtype=object))
+            parts['name'].append(names)
+            numbers.append(np.array(matching, dtype=int))
+            for name, value in (('D', D), ('nt', nt), ('doc', D), ('woc', D), ('f', f),
+                                ('ss', ss), ('N', N), ('fm', fm), ('Q', Q), ('Pm', Pm),
+                                ('percent_power', percent)):
+                parts[name].append(np.asarray(value, dtype=float))
+
+        for name in COLUMNS:
+            if parts[name]:
+                self.columns[name] = np.concatenate(parts[name])
+            else:
+                self.columns[name] = np.empty(0, dtype=object if name in TEXT_COLUMNS else float)
+
+        if numbers:
+            self.tool_numbers = np.concatenate(numbers)
+        for i in range(len(self)):
+            self.keys[self.key(i)] = i
+
+    def key(self, i):
+        c = self.columns
+        return (c['family'][i], c['species'][i], c['tool_material'][i], c['operation'][i],
+                int(self.tool_numbers[i]))
+
+    def __len__(self):
+        return len(self.columns['D'])
+
+    def get(self, family, species, tool_material, operation, tool):
+        """
+        Return the row for one selection and tool number as a dict, or None.
+        """
+        i = self.keys.get((family, species, tool_material, operation, tool))
+        if i is None:
+            return None
+        return self.row(i)
+
+    def row(self, i):
+        return {name: self.columns[name][i] for name in COLUMNS}
+
+    def select(self, family=None, species=None, tool_material=None, operation=None):
+        """
+        Indices of the rows matching the given selection fields.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in zip(KEY_COLUMNS, (family, species, tool_material, operation)):
+            if value is not None:
+                mask &= self.columns[name] == value
+        return np.flatnonzero(mask)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Read-only, memory-mapped binary feed and speed database.
+
+    python mapstore.py [--database feed_speed_database.ods | --db feeds.sqlite] -o feeds.vsdb
+    python vsfeedspeed.py --map feeds.vsdb
+
+Opening the file is an mmap and a short header read. Every array is a
+zero-copy view of the mapping, so the data is paged in as it's used and
+any number of processes opening the same file share one copy through the
+OS page cache. Replace the file with mapstore.py (it writes a new file and
+renames it) rather than editing it in place.
+
+Layout, little-endian:
+
+    MAGIC, uint64 header length, JSON header, then 64-byte aligned sections
+
+The header maps each section name to [offset, dtype, count]:
+
+    string_offsets, string_data  the string dictionary: UTF-8 bytes, and
+                                 where each string starts (count + 1 entries)
+    family, species, tool_material, operation
+                                 int32 codes into the dictionary, per row
+    doc, diameter, feed, speed   float64, per row (doc NaN for any DOC)
+    selections                   SELECTION_DTYPE, one per selection: its
+                                 codes, its rows, and its Grid in grids
+    grids                        float64: docs, diameters, feeds, speeds
+                                 of each selection's Grid, back to back
+
+Rows are grouped by selection. Grids are stored already resampled, so
+nothing is built when the file is opened.
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+from cache import LRUCache
+from interpolate import Grid
+from lookup import ReadOnlyIndex, Leaf, CACHE_SIZE, doc_value
+from records import StringTable
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "feed_speed_database.vsdb")
+MAGIC = b'VSFSMAP\x01'
+VERSION = 1
+ALIGN = 64
+LEAF_CACHE_SIZE = 64
+
+KEY_FIELDS = ['family', 'species', 'tool_material', 'operation']
+VALUE_FIELDS = ['doc', 'diameter', 'feed', 'speed']
+
+SELECTION_DTYPE = np.dtype([
+    ('family', '<i4'),
+    ('species', '<i4'),
+    ('tool_material', '<i4'),
+    ('operation', '<i4'),
+    ('row_start', '<i8'),
+    ('row_stop', '<i8'),
+    ('grid', '<i8'), # offset into grids
+    ('docs', '<i4'),
+    ('diameters', '<i4'),
+])
+
+
+def write_store(index, path=MAP_PATH):
+    """
+    Write every selection of a LookupIndex (or SQLStore, or MappedStore) to
+    path. Returns the number of rows written.
+    """
+    strings = StringTable()
+    selections = []
+    keys = []
+    values = []
+    grids = []
+    rows = 0
+    grid_size = 0
+    for selection in index.selections():
+        leaf = index.leaf(*selection)
+        grid = leaf.grid
+        source = np.array(leaf.source, dtype=float).reshape(-1, 4)
+        record = [strings.code(s) for s in selection]
+        record += [rows, rows + len(source), grid_size, len(grid.docs), len(grid.diameters)]
+        selections.append(tuple(record))
+        keys.append(np.repeat(np.array([record[:4]], dtype='<i4'), len(source), axis=0))
+        values.append(source)
+        for a in (grid.docs, grid.diameters, grid.feeds, grid.speeds):
+            grids.append(np.ravel(a).astype('<f8'))
+            grid_size += a.size
+        rows += len(source)
+
+    keys = np.concatenate(keys) if keys else np.empty((0, 4), dtype='<i4')
+    values = np.concatenate(values) if values else np.empty((0, 4))
+    encoded = [s.encode('utf-8') for s in strings.strings]
+    sections = [
+        ('string_offsets', np.cumsum([0] + [len(s) for s in encoded], dtype='<i8')),
+        ('string_data', np.frombuffer(b''.join(encoded), dtype='u1')),
+    ]
+    sections += [(name, np.ascontiguousarray(keys[:, i])) for i, name in enumerate(KEY_FIELDS)]
+    sections += [(name, np.ascontiguousarray(values[:, i], dtype='<f8'))
+                 for i, name in enumerate(VALUE_FIELDS)]
+    sections.append(('selections', np.array(selections, dtype=SELECTION_DTYPE)))
+    sections.append(('grids', np.concatenate(grids) if grids else np.empty(0)))
+
+    # the header holds the offsets, which depend on the header's length
+    header = {'version': VERSION, 'rows': rows, 'sections': {}}
+    start = 0
+    while True:
+        text = json.dumps(header).encode('utf-8')
+        offset = align(len(MAGIC) + 8 + len(text))
+        if offset == start:
+            break
+        start = offset
+        for name, array in sections:
+            header['sections'][name] = [offset, dtype_json(array.dtype), len(array)]
+            offset = align(offset + array.nbytes)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(text)).tobytes())
+        f.write(text)
+        for name, array in sections:
+            f.write(b'\0' * (header['sections'][name][0] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return rows
+
+
+def align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def dtype_json(dtype):
+    return dtype.descr if dtype.names else dtype.str
+
+
+def dtype_from_json(value):
+    if isinstance(value, str):
+        return np.dtype(value)
+    return np.dtype([tuple(field) for field in value])
+
+
+class MappedLeaf():
+    """
+    A selection of a MappedStore. The Grid is a view of the file; the rows
+    (for rows() and source) are only read when asked for.
+    """
+    def __init__(self, store, record):
+        self.store = store
+        self.record = record
+        grids = store.sections['grids']
+        nd = int(record['docs'])
+        nD = int(record['diameters'])
+        offset = int(record['grid'])
+        docs = grids[offset:offset + nd]
+        offset += nd
+        diameters = grids[offset:offset + nD]
+        offset += nD
+        feeds = grids[offset:offset + nd * nD].reshape(nd, nD)
+        offset += nd * nD
+        speeds = grids[offset:offset + nd * nD].reshape(nd, nD)
+        self.grid = Grid.from_arrays(docs, diameters, feeds, speeds)
+
+    @property
+    def source(self):
+        start, stop = int(self.record['row_start']), int(self.record['row_stop'])
+        columns = [self.store.sections[name][start:stop].tolist() for name in VALUE_FIELDS]
+        return [(doc_value(doc), diameter, feed, speed) for doc, diameter, feed, speed in zip(*columns)]
+
+    def rows(self, doc, diameter):
+        return Leaf(self.source).rows(doc, diameter)
+
+
+class MappedStore(ReadOnlyIndex):
+    """
+    Read-only index over a file written by write_store.
+
+    The tree holds each selection's record number; its MappedLeaf is made
+    when it's first looked up, and the most recent ones are kept in an LRU
+    cache, as in SQLStore.
+    """
+    def __init__(self, path=MAP_PATH, cache_size=CACHE_SIZE, mode='clamp',
+                 leaf_cache_size=LEAF_CACHE_SIZE):
+        ReadOnlyIndex.__init__(self, cache_size=cache_size, mode=mode)
+        self.path = path
+        self.leaves = LRUCache(leaf_cache_size)
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a mapped feed and speed database".format(path))
+        length = int(np.frombuffer(self.map, dtype='<u8', count=1, offset=len(MAGIC))[0])
+        start = len(MAGIC) + 8
+        header = json.loads(self.map[start:start + length].decode('utf-8'))
+        if header['version'] != VERSION:
+            raise ValueError("{} is version {}, expected {}".format(path, header['version'], VERSION))
+
+        self.sections = {}
+        for name, (offset, dtype, count) in header['sections'].items():
+            self.sections[name] = np.frombuffer(self.map, dtype=dtype_from_json(dtype),
+                                                count=count, offset=offset)
+
+        offsets = self.sections['string_offsets']
+        data = self.sections['string_data'].tobytes()
+        self.strings = [data[offsets[i]:offsets[i + 1]].decode('utf-8')
+                        for i in range(len(offsets) - 1)]
+
+        selections = self.sections['selections']
+        strings = self.strings
+        codes = zip(*(selections[name].tolist() for name in KEY_FIELDS))
+        for i, (family, species, tool_material, operation) in enumerate(codes):
+            node = self.tree.setdefault(strings[family], {}).setdefault(strings[species], {}) \
+                .setdefault(strings[tool_material], {})
+            node[strings[operation]] = i
+
+    def close(self):
+        """
+        Drop the views of the file and unmap it. Arrays still held elsewhere
+        (from column) keep the mapping alive until they're freed.
+        """
+        self.tree = {}
+        self.sections = {}
+        self.leaves.clear()
+        self.cache.clear()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __len__(self):
+        return len(self.sections['doc'])
+
+    def leaf(self, family, species, tool_material, operation):
+        try:
+            i = self.tree[family][species][tool_material][operation]
+        except KeyError:
+            return None
+        leaf = self.leaves.get(i)
+        if leaf is None:
+            leaf = MappedLeaf(self, self.sections['selections'][i])
+            self.leaves.put(i, leaf)
+        return leaf
+
+    def column(self, name):
+        """
+        A column of the table, decoded to strings for the key columns.
+        """
+        values = self.sections[name]
+        if name in KEY_FIELDS:
+            return np.array(self.strings, dtype=object)[values]
+        return values
+
+
+def main(argv=None):
+    import cli
+
+    parser = argparse.ArgumentParser(description="Write the feed and speed database as a memory-mapped file")
+    cli.add_database_arguments(parser)
+    parser.add_argument("-o", "--output", default=MAP_PATH, help="(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rows = write_store(cli.load_index(args), args.output)
+    print("Wrote {} rows to {}".format(rows, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
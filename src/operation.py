@@ -1,4 +1,10 @@
+import logging
 import math
+import numpy as np
+import instrument
+from power import get_power_table
+
+log = logging.getLogger(__name__)
 
 class Operation():
     def __init__(self, tool, material, width=None, doc=None):
@@ -13,6 +19,7 @@ class Operation():
         self.w = 2 # cut width (in)
         self.doc = .25 # depth of cut (in)
         self.ss = 0 # surface speed (ipm) or Cutting speed
+        self.operation = None # operation type, e.g. 'end mill'
 
         self.tool = tool
         self.material = material
@@ -21,26 +28,40 @@ class Operation():
         # self.calc_feed()
 
 
-    def calc_RPM(self):
+    def calc_RPM(self, max_rpm=None):
         if (self.tool.D == None):
-            print("Error: Tool diameter is not defined")
+            log.error("Tool diameter is not defined")
             return
 
-        self.N = (12 * self.ss) / (math.pi * self.tool.D)
-        self.N = rpm_round(self.N)
-        print("RPM: {}, diameter: {}".format(self.N, self.tool.D))
-
-    def calc_feedrate(self):
-        self.calc_RPM()
-        fm = self.f * self.tool.nt * self.N # milling machine table feed rate (ipm)
-        self.fm = round(fm, 1)
-        print("feedrate: {}".format(self.fm))
-
-    def calc_power(self):
+        with instrument.stage('calc_rpm', 1):
+            self.N = (12 * self.ss) / (math.pi * self.tool.D)
+            self.N = rpm_round(self.N)
+            if max_rpm and self.N > max_rpm:
+                self.N = int(max_rpm)
+        log.debug("RPM: %s, diameter: %s", self.N, self.tool.D)
+
+    def calc_feedrate(self, max_rpm=None):
+        self.calc_RPM(max_rpm)
+        with instrument.stage('calc_feed', 1):
+            fm = self.f * self.tool.nt * self.N # milling machine table feed rate (ipm)
+            self.fm = round(fm, 1)
+        log.debug("feedrate: %s", self.fm)
+
+    def calc_power(self, spindle=None):
+        """
+        Removal rate and power at the motor. With a spindle, its efficiency
+        is used and the percent of its horsepower is stored in percent_power.
+        """
         self.get_power_constant()
+        if spindle is not None:
+            self.E = spindle.E
 
-        self.Q = self.fm * self.w * self.doc
-        self.Pm = (self.Kp * self.C * self.Q * self.W) / self.E
+        Q, Pm, percent = calc_power_batch(self.fm, self.w, self.doc, self.Kp, self.E,
+                                          spindle.HP if spindle is not None else None,
+                                          self.C, self.W)
+        self.Q = float(Q)
+        self.Pm = float(Pm)
+        self.percent_power = float(percent)
 
     def set_operation(self):
         self.operation = ''
@@ -49,18 +70,15 @@ class Operation():
         try:
             material_df = self.material.material_list
 
-            print("HERE")
-            print(self.tool.material)
             material_df = material_df[(material_df["Tool Material"] == self.tool.material)]
 
-            print(material_df)
             sys.exit()
             # self.ss = self.material.material_dict['materials'][material]['operations']['End Milling']['tool_materials']['HSS']['s']
             # self.f = self.material.material_dict['materials'][material]['operations']['End Milling']['tool_materials']['HSS']['s']
             self.ss = self.material['s']
             self.f = self.material['f']
         except:
-            print("Material not found. Surface speed and or chipload not acquired.")
+            log.warning("Material not found. Surface speed and or chipload not acquired.")
 
     def get_feedrate(self):
         try:
@@ -69,19 +87,16 @@ class Operation():
             self.f = self.material['f'] * 0.001 # feed (in/tooth)
             self.s = self.material['s'] # surface speed in ft/min
         except Exception as e:
-            print("get_feedrate failed", e)
+            log.warning("get_feedrate failed: %s", e)
 
     def get_power_constant(self):
         """
-        Once material is known, lookup power constant
+        Once material is known, lookup power constant. NaN if the material
+        isn't in the power constant table.
         """
-        with open("power_constants.yaml", "r") as stream:
-            try:
-                power_constants = yaml.safe_load(stream)
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        self.Kp = power_constants["Material"][self.material.material]["Brinell Hardness"][100]['Kp']
+        table = get_power_table()
+        name = table.find(self.material.species, self.material.family)
+        self.Kp = float(table.kp(name, self.material.hardness))
 
 
 def rpm_round(x):
@@ -89,3 +104,76 @@ def rpm_round(x):
         return int(round(x / 10.0)) * 10
     else:
         return int(round(x / 100.0)) * 100
+
+
+def rpm_round_array(x):
+    """
+    Vectorized rpm_round. Rounds to the nearest 10 below 1000 RPM and the
+    nearest 100 above, half to even like the builtin round.
+    """
+    x = np.asarray(x, dtype=float)
+    return np.where(x < 1000, np.round(x / 10.0) * 10, np.round(x / 100.0) * 100)
+
+
+def round_feed(fm):
+    """
+    Vectorized round(fm, 1). np.round scales by 10 first, which can tip a
+    value sitting on a tie (17.05 gives 17.0 where round gives 17.1), so
+    values that close to a tie are rounded with the builtin.
+    """
+    fm = np.asarray(fm, dtype=float)
+    rounded = np.asarray(np.round(fm, 1))
+    with np.errstate(invalid='ignore'):
+        scaled = fm * 10
+        near = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near.any():
+        rounded[near] = [round(x, 1) for x in np.atleast_1d(fm[near]).tolist()]
+    return rounded[()]
+
+
+def calc_batch(diameters, flutes, surface_speeds, chiploads, widths=None, docs=None, max_rpm=None):
+    """
+    Calculate RPM, feedrate and removal rate for many operations at once.
+
+    All arguments are broadcast against each other. Returns (N, fm, Q)
+    arrays matching Operation.calc_RPM, calc_feedrate(max_rpm) and
+    calc_power. Q is NaN where no width or depth of cut is given.
+    """
+    D = np.asarray(diameters, dtype=float)
+    nt = np.asarray(flutes, dtype=float)
+    ss = np.asarray(surface_speeds, dtype=float)
+    f = np.asarray(chiploads, dtype=float)
+
+    with instrument.stage('calc_rpm', D.size), np.errstate(divide='ignore', invalid='ignore'):
+        N = rpm_round_array((12 * ss) / (math.pi * D))
+        if max_rpm:
+            N = np.where(N > max_rpm, int(max_rpm), N)
+    with instrument.stage('calc_feed', N.size):
+        fm = round_feed(f * nt * N)
+
+    if widths is None or docs is None:
+        Q = np.full(np.shape(fm), np.nan)
+    else:
+        Q = fm * np.asarray(widths, dtype=float) * np.asarray(docs, dtype=float)
+    return N, fm, Q
+
+
+def calc_power_batch(feedrates, widths, docs, Kp, E=1.0, HP=None, C=1.0, W=1.0):
+    """
+    Calculate removal rate Q, power at the motor Pm and the percent of the
+    spindle's horsepower HP required, for many operations at once.
+
+    All arguments are broadcast against each other. Percent is NaN where HP
+    is not given or zero.
+    """
+    fm = np.asarray(feedrates, dtype=float)
+    Q = fm * np.asarray(widths, dtype=float) * np.asarray(docs, dtype=float)
+    Pm = (np.asarray(Kp, dtype=float) * C * Q * W) / np.asarray(E, dtype=float)
+
+    if HP is None:
+        percent = np.full(np.shape(Pm), np.nan)
+    else:
+        HP = np.asarray(HP, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(HP > 0, 100 * Pm / HP, np.nan)
+    return Q, Pm, percent
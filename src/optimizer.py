@@ -0,0 +1,85 @@
+import math
+import numpy as np
+
+from operation import Operation, round_feed, rpm_round_array
+from power import get_power_table
+
+STEPS = 25
+
+
+def optimize(index, tool, material, operation, spindle, docs=None, wocs=None, rpms=None):
+    """
+    Find the DOC, WOC and RPM that maximize removal rate Q.
+
+    Every combination of the candidate DOCs, WOCs and RPMs is evaluated at
+    once. By default they are STEPS values each: DOC and WOC from 5% to 100%
+    of the tool diameter, and RPM up to the highest speed allowed at each
+    DOC. A candidate is feasible when:
+
+    - the RPM is within the spindle's max_rpm and doesn't exceed the
+      (rounded) RPM for the database surface speed at that DOC,
+    - the chipload is the database chipload for that DOC and diameter,
+    - the power at the motor is within the spindle's HP (skipped when the
+      material has no power constant).
+
+    Returns an Operation set up with the best candidate, or None if no
+    candidate is feasible.
+    """
+    D = tool.D
+    if not D:
+        raise ValueError("tool diameter is not defined")
+    if not spindle.max_rpm:
+        raise ValueError("spindle max_rpm is not defined")
+
+    if docs is None:
+        docs = np.linspace(0.05 * D, D, STEPS)
+    if wocs is None:
+        wocs = np.linspace(0.05 * D, D, STEPS)
+    docs = np.asarray(docs, dtype=float)
+    wocs = np.asarray(wocs, dtype=float)
+
+    feeds, speeds = index.feed_speed_batch(material.family, material.species, tool.material,
+                                           operation.operation, docs, D)
+    max_rpm = np.minimum(spindle.max_rpm, rpm_round_array((12 * speeds) / (math.pi * D)))
+
+    # rpms per doc, axes: doc, rpm
+    if rpms is None:
+        rpms = max_rpm[:, None] * np.linspace(1.0 / STEPS, 1.0, STEPS)[None, :]
+    rpms = rpm_round_array(np.broadcast_to(rpms, (len(docs), np.shape(rpms)[-1])))
+
+    # axes: doc, woc, rpm
+    f = feeds[:, None, None]
+    N = rpms[:, None, :]
+    # rounded as Operation.calc_feedrate does, so Q matches the reported fm
+    fm = round_feed(f * tool.nt * N)
+    max_rpm = max_rpm[:, None, None]
+    Q = fm * wocs[None, :, None] * docs[:, None, None]
+
+    table = get_power_table()
+    Kp = float(table.kp(table.find(material.species, material.family), material.hardness))
+    Pm = Kp * operation.C * Q * operation.W / spindle.E
+
+    feasible = np.isfinite(Q) & (N <= max_rpm)
+    if not math.isnan(Kp) and spindle.HP:
+        feasible &= Pm <= spindle.HP
+
+    if not feasible.any():
+        return None
+
+    best = np.unravel_index(np.argmax(np.where(feasible, Q, -np.inf)), Q.shape)
+    i, j, k = best
+
+    result = Operation(tool, material, width=wocs[j], doc=docs[i])
+    result.operation = operation.operation
+    result.doc = float(docs[i])
+    result.w = float(wocs[j])
+    result.f = float(feeds[i])
+    result.ss = float(speeds[i])
+    result.N = int(rpms[i, k])
+    result.fm = float(fm[i, 0, k])
+    result.Kp = Kp
+    result.E = spindle.E
+    result.Q = float(Q[best])
+    result.Pm = float(Pm[best])
+    result.percent_power = 100 * result.Pm / spindle.HP if spindle.HP else float('nan')
+    return result
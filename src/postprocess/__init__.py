@@ -0,0 +1,3 @@
+"""
+Charts and reports built from the calculator's results.
+"""
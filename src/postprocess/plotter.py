@@ -1,3 +1,253 @@
-import matplotlib.pyplot as plt
+#!/usr/bin/env python3
+"""
+Feed and speed charts for a material.
 
-def feed_vs_rpm(material):
+    cd src && python -m postprocess.plotter --material wood [--species MDF] -o wood.png
+
+renders feedrate vs RPM, chipload vs diameter and power vs DOC for every
+tool and operation of the material, headless with the Agg backend, to a
+PNG or SVG (from the file extension) for batch reports.
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from machine import Spindle
+from machine_table import DEFAULT_TOOLS
+from operation import rpm_round_array, calc_power_batch
+from power import get_power_table
+
+POINTS = 50
+MAX_RPM = 24000 # RPM axis when the spindle has no max_rpm
+DIAMETERS = (0.0625, 1.0) # chipload vs diameter range (in)
+LEGEND_MAX = 12 # more curves than this are drawn without a legend
+
+# name, title, x label, y label
+CHARTS = [
+    ('feed_vs_rpm', "Feedrate vs RPM", "RPM", "Feedrate (in/min)"),
+    ('chipload_vs_diameter', "Chipload vs diameter", "Diameter (in)", "Chipload (in/tooth)"),
+    ('power_vs_doc', "Power vs DOC", "DOC (in)", "Power at motor (HP)"),
+]
+
+
+class Curves():
+    """
+    The lines of one chart. Row i of x and y is the curve labelled
+    labels[i]; NaNs in y break the line.
+    """
+    def __init__(self, title, xlabel, ylabel, labels, x, y):
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.labels = labels
+        self.x = x
+        self.y = y
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def material_curves(index, family, species=None, tools=None, spindle=None, hardness=0,
+                    points=POINTS, operation=None):
+    """
+    Compute every chart in CHARTS for a material in one pass over the database.
+
+    Each selection of the material is looked up once: the sample points of
+    all three charts (each tool at a full slot, the diameter sweep, and
+    each tool's DOC sweep) are stacked into a single feed_speed_batch call
+    and the curves are sliced out of the result.
+
+    Tools run at a full slot (DOC and WOC equal to the diameter), as in
+    MachineTable. Feedrate vs RPM stops at the RPM for the database
+    surface speed. Power vs DOC runs each tool at that RPM, capped at the
+    spindle's max_rpm, and is NaN for materials without a power constant.
+    species and operation narrow the selections. Returns {name: Curves}.
+    """
+    tools = DEFAULT_TOOLS if tools is None else tools
+    spindle = spindle if spindle is not None else Spindle()
+    max_rpm = spindle.max_rpm or MAX_RPM
+    rpms = np.linspace(0, max_rpm, points)
+    diameters = np.linspace(DIAMETERS[0], DIAMETERS[1], points)
+    fractions = np.linspace(1.0 / points, 1.0, points)
+    power_table = get_power_table()
+
+    parts = {name: ([], [], []) for name, _, _, _ in CHARTS}
+    for fam, sp, tool_material, op in index.selections():
+        if fam != family or species not in (None, sp) or operation not in (None, op):
+            continue
+        matching = [t for t in tools if t.material in (None, tool_material) and t.D]
+        D = np.array([t.D for t in matching], dtype=float)
+        nt = np.array([t.nt for t in matching], dtype=float)
+        n = len(D)
+        doc_sweep = D[:, None] * fractions[None, :]
+
+        f, ss = index.feed_speed_batch(fam, sp, tool_material, op,
+                                       np.concatenate([D, diameters, doc_sweep.ravel()]),
+                                       np.concatenate([D, diameters, np.repeat(D, points)]))
+        f_slot, ss_slot = f[:n], ss[:n]
+        f_diameter = f[n:n + points]
+        f_doc = f[n + points:].reshape(n, points)
+        ss_doc = ss[n + points:].reshape(n, points)
+
+        selection = "{} {} {}".format(tool_material, op, "" if species else sp).strip()
+        labels, x, y = parts['chipload_vs_diameter']
+        labels.append(selection)
+        x.append(diameters)
+        y.append(f_diameter)
+        if not n:
+            continue
+        names = ["{} {}".format(t.name or "{:g} in".format(t.D), selection) for t in matching]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rpm_limit = rpm_round_array((12 * ss_slot) / (math.pi * D))
+            N = np.minimum(rpm_round_array((12 * ss_doc) / (math.pi * D[:, None])), max_rpm)
+        fm = f_slot[:, None] * nt[:, None] * rpms[None, :]
+        labels, x, y = parts['feed_vs_rpm']
+        labels.extend(names)
+        x.append(np.broadcast_to(rpms, (n, points)))
+        y.append(np.where(rpms[None, :] <= rpm_limit[:, None], fm, np.nan))
+
+        Kp = power_table.kp(power_table.find(sp, fam), hardness)
+        _, Pm, _ = calc_power_batch(f_doc * nt[:, None] * N, D[:, None], doc_sweep, Kp, spindle.E)
+        labels, x, y = parts['power_vs_doc']
+        labels.extend(names)
+        x.append(doc_sweep)
+        y.append(Pm)
+
+    curves = {}
+    for name, title, xlabel, ylabel in CHARTS:
+        labels, x, y = parts[name]
+        if not x:
+            x = y = [np.empty((0, points))]
+        curves[name] = Curves(title, xlabel, ylabel, labels, np.vstack(x), np.vstack(y))
+    return curves
+
+
+def feed_vs_rpm(material, index=None, tools=None, spindle=None):
+    """
+    Feedrate vs RPM curves for a Material's family (and species, if set).
+    """
+    if index is None:
+        import database
+        from lookup import LookupIndex
+        index = LookupIndex(database.load_table())
+    return material_curves(index, material.family, material.species, tools, spindle,
+                           material.hardness)['feed_vs_rpm']
+
+
+class Chart():
+    """
+    Draws Curves on a matplotlib Axes.
+
+    Later updates move the existing lines with set_data instead of clearing
+    the axes, so redrawing after an input change only re-renders the lines
+    (the legend is rebuilt only when the labels change).
+    """
+    def __init__(self, ax):
+        self.ax = ax
+        self.lines = []
+        self.marker = None
+        self.labels = None
+        self.note = ax.text(0.5, 0.5, "No data", transform=ax.transAxes, ha='center',
+                            va='center', visible=False)
+
+    def update(self, curves, point=None):
+        """
+        Show curves, plus a marker at point (x, y) if given.
+        """
+        ax = self.ax
+        for i in range(len(curves)):
+            if i < len(self.lines):
+                self.lines[i].set_data(curves.x[i], curves.y[i])
+                self.lines[i].set_label(curves.labels[i])
+            else:
+                self.lines.append(ax.plot(curves.x[i], curves.y[i], label=curves.labels[i],
+                                          linewidth=1)[0])
+        for line in self.lines[len(curves):]:
+            line.remove()
+        del self.lines[len(curves):]
+
+        if point is None or not all(np.isfinite(point)):
+            if self.marker is not None:
+                self.marker.set_visible(False)
+        elif self.marker is None:
+            self.marker = ax.plot([point[0]], [point[1]], 'o', color='black')[0]
+        else:
+            self.marker.set_data([point[0]], [point[1]])
+            self.marker.set_visible(True)
+
+        if ax.get_title() != curves.title:
+            ax.set_title(curves.title)
+            ax.set_xlabel(curves.xlabel)
+            ax.set_ylabel(curves.ylabel)
+        if curves.labels != self.labels:
+            self.labels = list(curves.labels)
+            legend = ax.get_legend()
+            if legend is not None:
+                legend.remove()
+            if 0 < len(curves) <= LEGEND_MAX:
+                ax.legend(fontsize='x-small')
+        self.note.set_visible(not np.isfinite(curves.y).any())
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+
+
+def render(curves, fig=None):
+    """
+    Draw each chart of curves ({name: Curves}) on its own row of a Figure.
+    """
+    from matplotlib.figure import Figure
+
+    if fig is None:
+        fig = Figure(figsize=(8, 4 * len(curves)))
+    for i, chart in enumerate(curves.values()):
+        Chart(fig.add_subplot(len(curves), 1, i + 1)).update(chart)
+    fig.tight_layout()
+    return fig
+
+
+def save(curves, path, fmt=None):
+    """
+    Render headless with Agg and write a PNG or SVG (format from the path
+    unless fmt is given).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = render(curves)
+    FigureCanvasAgg(fig)
+    fig.savefig(path, format=fmt)
+    return path
+
+
+def main(argv=None):
+    import cli
+
+    parser = argparse.ArgumentParser(description="Render feed and speed charts for a material")
+    cli.add_database_arguments(parser)
+    parser.add_argument("--material", required=True, help="workpiece material family, e.g. wood")
+    parser.add_argument("--species", help="only this species, e.g. MDF")
+    parser.add_argument("--hardness", type=float, default=0, help="workpiece Brinell hardness")
+    parser.add_argument("--max-rpm", type=float, help="spindle max RPM (default: {})".format(MAX_RPM))
+    parser.add_argument("--efficiency", type=float, default=1.0,
+                        help="machine tool efficiency factor (default: %(default)s)")
+    parser.add_argument("-o", "--output", required=True, help="PNG or SVG file to write")
+    args = parser.parse_args(argv)
+
+    index = cli.load_index(args)
+    spindle = Spindle()
+    spindle.max_rpm = args.max_rpm or 0
+    spindle.E = args.efficiency
+    curves = material_curves(index, args.material, args.species, spindle=spindle,
+                             hardness=args.hardness)
+    if not len(curves['chipload_vs_diameter']):
+        print("No data for {}".format(args.material), file=sys.stderr)
+        return 1
+    save(curves, args.output)
+    print("Wrote {}".format(args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import os
+import numpy as np
+
+POWER_CONSTANTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "data", "power_constants.yaml")
+
+
+class PowerTable():
+    """
+    Power constants by material, kept as sorted hardness and Kp arrays.
+    """
+    def __init__(self, constants=None):
+        self.materials = {}
+        if constants:
+            self.build(constants)
+
+    @classmethod
+    def load(cls, path=POWER_CONSTANTS_PATH):
+        import yaml
+
+        with open(path, "r") as stream:
+            return cls(yaml.safe_load(stream))
+
+    def build(self, constants):
+        for name, entry in constants["Material"].items():
+            points = sorted((float(hb), float(v['Kp']))
+                            for hb, v in entry["Brinell Hardness"].items())
+            self.materials[name] = (np.array([hb for hb, _ in points]),
+                                    np.array([kp for _, kp in points]))
+
+    def find(self, *names):
+        """
+        Return the first of names that has an entry, or None.
+        """
+        for name in names:
+            if name in self.materials:
+                return name
+        return None
+
+    def kp(self, material, hardness):
+        """
+        Kp interpolated by Brinell hardness, clamped to the table's range.
+
+        hardness may be an array. Unknown materials give NaN.
+        """
+        if material not in self.materials:
+            return np.full(np.shape(hardness), np.nan)[()]
+        hb, kp = self.materials[material]
+        return np.interp(hardness, hb, kp)
+
+
+_table = None
+
+
+def get_power_table():
+    """
+    The power constant table, read from disk on first use only.
+    """
+    global _table
+    if _table is None:
+        _table = PowerTable.load()
+    return _table
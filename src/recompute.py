@@ -0,0 +1,52 @@
+class RecomputeGraph():
+    """
+    Tracks which calculation stages depend on which inputs.
+
+    Changing an input marks every stage downstream of it dirty, and run()
+    re-runs only the dirty stages, in the order they were added. A stage
+    that starts asynchronous work returns False; its dependents wait until
+    resolve() is called with its name.
+    """
+    def __init__(self):
+        self.stages = [] # (name, fn, depends_on) in run order
+        self.dependents = {}
+        self.dirty = set()
+        self.pending = set()
+
+    def add_stage(self, name, fn, depends_on):
+        self.stages.append((name, fn, tuple(depends_on)))
+        for dep in depends_on:
+            self.dependents.setdefault(dep, []).append(name)
+
+    def mark(self, name):
+        """
+        Mark everything downstream of an input or stage dirty.
+        """
+        stack = list(self.dependents.get(name, []))
+        while stack:
+            stage = stack.pop()
+            if stage not in self.dirty:
+                self.dirty.add(stage)
+                stack.extend(self.dependents.get(stage, []))
+
+    def mark_all(self):
+        for name, fn, depends_on in self.stages:
+            self.dirty.add(name)
+
+    def run(self):
+        for name, fn, depends_on in self.stages:
+            if name not in self.dirty:
+                continue
+            if any(dep in self.dirty or dep in self.pending for dep in depends_on):
+                continue
+            self.dirty.discard(name)
+            if fn() is False:
+                self.pending.add(name)
+
+    def resolve(self, name):
+        """
+        Finish an asynchronous stage and run whatever depends on it.
+        """
+        self.pending.discard(name)
+        self.mark(name)
+        self.run()
@@ -0,0 +1,289 @@
+"""
+Compact storage for many tools, materials and operations.
+
+Tool, Material and Operation are ordinary objects, which is fine for the
+one job the GUI works on but costs well over a kilobyte per operation once
+batch job planning holds millions of them. The record collections here keep
+each field in a NumPy structured array instead, with text (names, families,
+tool materials) stored as int32 codes into a shared string table. They
+convert to and from the regular classes, so the GUI code keeps using those.
+"""
+import math
+
+import numpy as np
+
+from tool import Tool
+from material import Material
+from operation import Operation
+
+NONE = -1 # code for a missing string
+
+TOOL_FIELDS = [
+    ('tool_name', 'i4'),
+    ('tool_material', 'i4'),
+    ('D', 'f8'),
+    ('nt', 'i2'),
+    ('stickout', 'f8'),
+]
+
+MATERIAL_FIELDS = [
+    ('material_name', 'i4'),
+    ('family', 'i4'),
+    ('species', 'i4'),
+    ('hardness', 'f8'),
+    ('surface_speed', 'f8'),
+]
+
+OPERATION_FIELDS = TOOL_FIELDS + MATERIAL_FIELDS + [
+    ('operation', 'i4'),
+    ('doc', 'f8'),
+    ('w', 'f8'),
+    ('f', 'f8'),
+    ('ss', 'f8'),
+    ('N', 'i4'),
+    ('fm', 'f8'),
+    ('Q', 'f8'),
+    ('Pm', 'f8'),
+    ('percent_power', 'f8'),
+    ('Kp', 'f8'),
+    ('E', 'f8'),
+    ('C', 'f8'),
+    ('W', 'f8'),
+]
+
+TOOL_DTYPE = np.dtype(TOOL_FIELDS)
+MATERIAL_DTYPE = np.dtype(MATERIAL_FIELDS)
+OPERATION_DTYPE = np.dtype(OPERATION_FIELDS)
+
+
+class StringTable():
+    """
+    Interns strings to int32 codes. None is NONE.
+    """
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def code(self, s):
+        if s is None:
+            return NONE
+        code = self.codes.get(s)
+        if code is None:
+            code = self.codes[s] = len(self.strings)
+            self.strings.append(s)
+        return code
+
+    def encode(self, values):
+        """
+        Codes for an array of strings, interning each distinct value once.
+        """
+        values = np.asarray(values, dtype=object).ravel()
+        codes = np.full(len(values), NONE, dtype=np.int32)
+        present = np.not_equal(values, None)
+        if present.any():
+            uniques, inverse = np.unique(values[present].astype(str), return_inverse=True)
+            codes[present] = np.array([self.code(str(s)) for s in uniques], dtype=np.int32)[inverse]
+        return codes
+
+    def string(self, code):
+        return None if code == NONE else self.strings[code]
+
+    def decode(self, codes):
+        lookup = np.array(self.strings + [None], dtype=object)
+        return lookup[np.asarray(codes)]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+def to_field(value):
+    return float('nan') if value is None else value
+
+
+def from_field(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class Records():
+    """
+    A growable structured array of records of one dtype.
+
+    Columns are read with records['field'] (text fields give codes, use
+    text(field) for the strings). Adding rows one at a time reallocates by
+    doubling, extend() adds whole columns at once.
+    """
+    dtype = None
+    text_fields = ()
+
+    def __init__(self, capacity=0, strings=None):
+        self.data = np.zeros(capacity, dtype=self.dtype)
+        self.size = 0
+        self.strings = strings if strings is not None else StringTable()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, field):
+        return self.data[field][:self.size]
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def reserve(self, n):
+        if n > len(self.data):
+            data = np.zeros(max(n, 2 * len(self.data), 16), dtype=self.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+
+    def append_row(self, values):
+        """
+        Add one record from a dict of field values, strings for text fields.
+        """
+        self.reserve(self.size + 1)
+        row = self.data[self.size]
+        for name in self.dtype.names:
+            value = values.get(name)
+            if name in self.text_fields:
+                row[name] = self.strings.code(value)
+            elif value is None and self.dtype[name].kind != 'f':
+                row[name] = 0
+            else:
+                row[name] = to_field(value)
+        self.size += 1
+        return self.size - 1
+
+    def extend(self, n, **columns):
+        """
+        Add n records from columns (scalars or length n arrays). Text fields
+        take strings. Fields not given are NaN, or 0 for integer fields.
+        """
+        self.reserve(self.size + n)
+        block = self.data[self.size:self.size + n]
+        for name in self.dtype.names:
+            if name in columns:
+                value = columns[name]
+                if name in self.text_fields:
+                    value = self.strings.encode(np.broadcast_to(np.asarray(value, dtype=object), (n,)))
+                block[name] = value
+            elif name in self.text_fields:
+                block[name] = NONE
+            elif block.dtype[name].kind == 'f':
+                block[name] = np.nan
+            else:
+                block[name] = 0
+        self.size += n
+
+    def text(self, field):
+        return self.strings.decode(self[field])
+
+    def row_values(self, i):
+        """
+        The fields of record i as a dict, with strings for text fields.
+        """
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        row = self.data[i]
+        values = {}
+        for name in self.dtype.names:
+            if name in self.text_fields:
+                values[name] = self.strings.string(int(row[name]))
+            else:
+                values[name] = row[name].item()
+        return values
+
+
+def tool_values(tool):
+    return {'tool_name': tool.name, 'tool_material': tool.material, 'D': tool.D,
+            'nt': tool.nt, 'stickout': tool.stickout}
+
+
+def make_tool(values):
+    tool = Tool(from_field(values['D']), int(values['nt']), values['tool_material'],
+                values['tool_name'] or '')
+    tool.stickout = values['stickout']
+    return tool
+
+
+def material_values(material):
+    return {'material_name': material.name, 'family': material.family,
+            'species': material.species, 'hardness': material.hardness,
+            'surface_speed': material.surface_speed}
+
+
+def make_material(values):
+    material = Material(values['family'])
+    material.name = values['material_name'] or ''
+    material.species = values['species']
+    material.hardness = values['hardness']
+    material.surface_speed = values['surface_speed']
+    return material
+
+
+class ToolRecords(Records):
+    dtype = TOOL_DTYPE
+    text_fields = ('tool_name', 'tool_material')
+
+    def append(self, tool):
+        return self.append_row(tool_values(tool))
+
+    def tool(self, i):
+        return make_tool(self.row_values(i))
+
+
+class MaterialRecords(Records):
+    dtype = MATERIAL_DTYPE
+    text_fields = ('material_name', 'family', 'species')
+
+    def append(self, material):
+        return self.append_row(material_values(material))
+
+    def material(self, i):
+        return make_material(self.row_values(i))
+
+
+class OperationRecords(Records):
+    """
+    Operations with their tool and material folded into each record.
+    """
+    dtype = OPERATION_DTYPE
+    text_fields = ToolRecords.text_fields + MaterialRecords.text_fields + ('operation',)
+
+    # set by calc_feedrate and calc_power, so not every Operation has them
+    optional_fields = ('fm', 'percent_power')
+
+    @classmethod
+    def from_operations(cls, operations):
+        records = cls()
+        for op in operations:
+            records.append(op)
+        return records
+
+    def append(self, op):
+        values = tool_values(op.tool)
+        values.update(material_values(op.material))
+        for name in ('operation', 'doc', 'w', 'f', 'ss', 'N', 'Q', 'Pm', 'Kp', 'E', 'C', 'W'):
+            values[name] = getattr(op, name)
+        for name in self.optional_fields:
+            values[name] = getattr(op, name, None)
+        return self.append_row(values)
+
+    def operation(self, i):
+        """
+        Rebuild record i as an Operation with its own Tool and Material.
+        """
+        values = self.row_values(i)
+        op = Operation(make_tool(values), make_material(values))
+        op.operation = values['operation']
+        for name in ('doc', 'w', 'f', 'ss', 'Q', 'Pm', 'Kp', 'E', 'C', 'W'):
+            setattr(op, name, values[name])
+        op.N = int(values['N'])
+        for name in self.optional_fields:
+            if not math.isnan(values[name]):
+                setattr(op, name, values[name])
+        return op
+
+    def operations(self):
+        for i in range(len(self)):
+            yield self.operation(i)
@@ -0,0 +1,198 @@
+"""
+Canonical schema for feed and speed data from any source.
+
+Spreadsheet sheets and vendor CSVs each spell their headers, units and
+values a little differently. ingest() reads them one sheet (or one CSV
+chunk) at a time and yields rows in the canonical form below, so a large
+catalog never has to be held as a single DataFrame.
+"""
+import os
+import re
+
+from lookup import is_missing
+
+CSV_CHUNK_SIZE = 10000
+# converted values are rounded to this many places, so 6.35 mm is .25 in
+UNIT_PLACES = 6
+
+# column, unit
+CANONICAL = [
+    ('family', None),
+    ('species', None),
+    ('hardness', 'HB'),
+    ('operation', None),
+    ('tool_material', None),
+    ('doc', 'in'),
+    ('diameter', 'in'),
+    ('feed', 'in/tooth'),
+    ('speed', 'sfm'),
+]
+COLUMNS = [name for name, _ in CANONICAL]
+NUMERIC_COLUMNS = ['hardness', 'doc', 'diameter', 'feed', 'speed']
+REQUIRED_COLUMNS = ['family', 'operation', 'tool_material', 'feed', 'speed']
+
+# accepted headers (lowercase) for each column, most specific first. The
+# Amana sheet has both a Feed (a feedrate in ipm) and a Chipload per tooth
+# column, so the chipload has to win.
+ALIASES = {
+    'family': ['material family', 'family', 'material'],
+    'species': ['material species', 'species'],
+    'hardness': ['hardness', 'brinell hardness'],
+    'operation': ['operation'],
+    'tool_material': ['tool material', 'cutter material'],
+    'doc': ['doc', 'depth of cut'],
+    'diameter': ['cutter diameter', 'tool diameter', 'diameter'],
+    'feed': ['feed per tooth', 'chipload per tooth', 'chipload', 'fz', 'feed'],
+    'speed': ['speed', 'surface speed', 'vc'],
+}
+
+# factor to the canonical unit, for units given in a header, e.g. "Diameter (mm)"
+UNITS = {
+    'in': 1.0,
+    'mm': 1 / 25.4,
+    'in/tooth': 1.0,
+    'ipt': 1.0,
+    'mm/tooth': 1 / 25.4,
+    'sfm': 1.0,
+    'ft/min': 1.0,
+    'm/min': 1 / 0.3048,
+    'hb': 1.0,
+}
+
+# spellings of the same value, lowercase -> canonical
+VALUES = {
+    'operation': {'endmill': 'end mill', 'end-mill': 'end mill'},
+    'tool_material': {'hss': 'HSS', 'carbide': 'carbide'},
+}
+
+HEADER_RE = re.compile(r'^\s*(.*?)\s*(?:[\(\[]\s*(.*?)\s*[\)\]])?\s*$')
+
+
+def split_header(header):
+    """
+    Return the lowercase name and unit of a header like "Cutter Diameter (mm)".
+    """
+    name, unit = HEADER_RE.match(str(header)).groups()
+    name = ' '.join(name.lower().split())
+    return name, unit.lower() if unit else None
+
+
+def map_headers(headers):
+    """
+    Return {column: (header, factor)} for the canonical columns found in
+    headers. Raises ValueError for a unit it doesn't know.
+    """
+    found = {}
+    for header in headers:
+        name, unit = split_header(header)
+        found.setdefault(name, (header, unit))
+
+    mapping = {}
+    for column, aliases in ALIASES.items():
+        for alias in aliases:
+            if alias in found:
+                header, unit = found[alias]
+                if unit is None:
+                    factor = 1.0
+                elif unit in UNITS:
+                    factor = UNITS[unit]
+                else:
+                    raise ValueError("unknown unit {!r} in column {!r}".format(unit, header))
+                mapping[column] = (header, factor)
+                break
+    return mapping
+
+
+def normalize_value(column, value):
+    text = ' '.join(str(value).split())
+    if column == 'family':
+        return text.lower()
+    if column in VALUES:
+        return VALUES[column].get(text.lower(), text)
+    return text
+
+
+class Normalizer():
+    """
+    Turns the records of one source into canonical rows.
+
+    Rows with a blank family continue the material of the row above (its
+    species too, unless the row has its own), as in Table_15a. That
+    carries over between chunks of the same source.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.family = None
+        self.species = None
+
+    def rows(self, df):
+        mapping = map_headers(df.columns)
+        missing = [c for c in REQUIRED_COLUMNS if c not in mapping]
+        if missing:
+            # not a feed and speed table
+            return
+
+        for record in df.to_dict('records'):
+            row = {}
+            for column, (header, factor) in mapping.items():
+                value = record[header]
+                if is_missing(value):
+                    row[column] = None
+                elif column in NUMERIC_COLUMNS:
+                    try:
+                        value = float(value)
+                        row[column] = value if factor == 1.0 else round(value * factor, UNIT_PLACES)
+                    except (TypeError, ValueError):
+                        row[column] = None
+                else:
+                    row[column] = normalize_value(column, value)
+
+            if row.get('family') is None:
+                row['family'] = self.family
+                if row.get('species') is None:
+                    row['species'] = self.species
+            self.family, self.species = row['family'], row.get('species')
+
+            if any(row.get(c) is None for c in REQUIRED_COLUMNS):
+                continue
+            if row.get('species') is None:
+                row['species'] = ''
+            # DOC 0 or blank means any DOC. It's kept as None so lookups can
+            # tell these rows from real DOCs (see lookup.Leaf)
+            row['doc'] = row.get('doc') or None
+            row['diameter'] = row.get('diameter') or 0.0
+            yield tuple(row.get(c) for c in COLUMNS)
+
+
+def read_chunks(path, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Yield (source, DataFrame) pieces of a spreadsheet or CSV: one per sheet,
+    or one per chunk_size rows of a CSV.
+    """
+    import pandas as pd
+
+    name = os.path.basename(path)
+    if os.path.splitext(path)[1].lower() == '.csv':
+        for chunk in pd.read_csv(path, chunksize=chunk_size, skipinitialspace=True):
+            yield name, chunk
+        return
+
+    with pd.ExcelFile(path, engine="odf") as book:
+        for sheet in book.sheet_names:
+            yield sheet, book.parse(sheet)
+
+
+def ingest(paths, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Yield (source, row) for every canonical row in the given spreadsheets
+    and CSVs, in order. Rows are not deduplicated here; the store keeps the
+    first of each (family, species, tool material, operation, DOC, diameter).
+    """
+    normalizers = {}
+    for path in paths:
+        for source, df in read_chunks(path, chunk_size):
+            key = (path, source)
+            if key not in normalizers:
+                normalizers[key] = Normalizer(source)
+            for row in normalizers[key].rows(df):
+                yield source, row
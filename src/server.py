@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Local HTTP/JSON feed and speed service.
+
+    python server.py [--port 8765] [database options]
+
+Loads the database once and answers requests from CAM workstations and
+other shop software without the GUI. Listens on localhost only by default.
+
+    GET  /health
+    GET  /families
+    GET  /species?family=wood
+    GET  /tool_materials?family=wood&species=MDF
+    GET  /operations?family=wood&species=MDF&tool_material=HSS
+    GET  /lookup?family=wood&species=MDF&tool_material=HSS&operation=end+mill&diameter=.25&doc=.1
+    POST /calculate   {"jobs": [{"material": "wood", "species": "MDF", ...}]}
+    GET  /stats
+
+Jobs for /calculate use the batch CSV columns, see cli.JOB_FIELDS. Every
+response carries its latency in an X-Response-Time header (milliseconds),
+and /stats reports the count, mean and max latency per path. With -v every
+request is logged, and --metrics prints the pipeline stage timings
+(including each request's) on exit.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import cli
+import instrument
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 16 * 1024 * 1024
+# batches at least this big are calculated off the event loop
+EXECUTOR_JOBS = 256
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class Stats():
+    """
+    Request count and latency per path.
+    """
+    def __init__(self):
+        self.paths = {}
+
+    def add(self, path, seconds):
+        entry = self.paths.setdefault(path, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def to_dict(self):
+        return {path: {"count": n, "mean_ms": round(1000 * total / n, 3), "max_ms": round(1000 * peak, 3)}
+                for path, (n, total, peak) in self.paths.items()}
+
+
+class FeedSpeedServer():
+    def __init__(self, index):
+        self.index = index
+        self.stats = Stats()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/families"): self.families,
+            ("GET", "/species"): self.species,
+            ("GET", "/tool_materials"): self.tool_materials,
+            ("GET", "/operations"): self.operations,
+            ("GET", "/lookup"): self.lookup,
+            ("POST", "/calculate"): self.calculate,
+            ("GET", "/stats"): self.get_stats,
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def handle_client(self, reader, writer):
+        """
+        Serve requests on one connection until the client closes it.
+        """
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                start = time.perf_counter()
+                path = urlsplit(target).path
+                with instrument.stage('request', 1):
+                    try:
+                        status, payload = 200, await self.dispatch(method, target, body)
+                    except HTTPError as e:
+                        status, payload = e.status, {"error": str(e)}
+                    except Exception as e:
+                        log.exception("%s %s failed", method, target)
+                        status, payload = 500, {"error": "{}: {}".format(type(e).__name__, e)}
+                elapsed = time.perf_counter() - start
+                self.stats.add(path, elapsed)
+                log.info("%s %s %d %.3f ms", method, target, status, 1000 * elapsed)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(response(status, payload, elapsed, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            writer.write(response(e.status, {"error": str(e)}, 0.0, False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HTTPError(405, "{} not allowed on {}".format(method, url.path))
+            raise HTTPError(404, "no such path {}".format(url.path))
+        params = dict(parse_qsl(url.query))
+        return await handler(params, body)
+
+    async def health(self, params, body):
+        return {"status": "ok"}
+
+    async def families(self, params, body):
+        return {"families": self.index.families()}
+
+    async def species(self, params, body):
+        return {"species": self.index.species(required(params, "family"))}
+
+    async def tool_materials(self, params, body):
+        return {"tool_materials": self.index.tool_materials(required(params, "family"),
+                                                            params.get("species"))}
+
+    async def operations(self, params, body):
+        return {"operations": self.index.operations(required(params, "family"),
+                                                    params.get("species"),
+                                                    params.get("tool_material"))}
+
+    async def lookup(self, params, body):
+        """
+        Interpolated feed and speed, with the database rows bracketing the query.
+        """
+        selection = (required(params, "family"), required(params, "species"),
+                     required(params, "tool_material"), params.get("operation", cli.DEFAULT_OPERATION))
+        diameter = number(params, "diameter")
+        doc = number(params, "doc", diameter)
+        result = self.index.feed_speed(*selection, doc, diameter)
+        if result is None:
+            raise HTTPError(404, "no feed and speed for this selection")
+        return {"feed": result[0], "speed": result[1],
+                "rows": [dict(zip(("doc", "diameter", "feed", "speed"), row))
+                         for row in self.index.rows(*selection, doc, diameter)]}
+
+    async def calculate(self, params, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, "invalid JSON: {}".format(e))
+        jobs = data.get("jobs") if isinstance(data, dict) else None
+        if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+            raise HTTPError(400, "expected {\"jobs\": [{...}, ...]}")
+
+        try:
+            if len(jobs) >= EXECUTOR_JOBS:
+                # keep answering other clients while a big batch runs
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(None, cli.calc_jobs, self.index, jobs)
+            else:
+                results = cli.calc_jobs(self.index, jobs)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return {"results": results}
+
+    async def get_stats(self, params, body):
+        return {"paths": self.stats.to_dict()}
+
+
+def required(params, name):
+    if name not in params:
+        raise HTTPError(400, "missing parameter {}".format(name))
+    return params[name]
+
+
+def number(params, name, default=None):
+    if name not in params:
+        if default is None:
+            raise HTTPError(400, "missing parameter {}".format(name))
+        return default
+    try:
+        return float(params[name])
+    except ValueError:
+        raise HTTPError(400, "{} is not a number".format(name))
+
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request. Returns (method, target, headers, body), or
+    None when the client has closed the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body over {} bytes".format(MAX_BODY))
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def response(status, payload, elapsed, keep_alive=True):
+    body = json.dumps(payload).encode("utf-8")
+    head = ("HTTP/1.1 {} {}\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "X-Response-Time: {:.3f}\r\n"
+            "Connection: {}\r\n\r\n").format(status, REASONS.get(status, ""), len(body),
+                                             1000 * elapsed, "keep-alive" if keep_alive else "close")
+    return head.encode("latin-1") + body
+
+
+async def serve(index, host, port):
+    server = await FeedSpeedServer(index).start(host, port)
+    for sock in server.sockets:
+        print("Serving on http://{}:{}".format(*sock.getsockname()[:2]), file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local feed and speed HTTP/JSON service")
+    cli.add_database_arguments(parser)
+    parser.add_argument("--host", default=DEFAULT_HOST, help="(default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="(default: %(default)s)")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="log every request and its latency, -vv also every pipeline stage")
+    parser.add_argument("--metrics", action="store_true",
+                        help="print the time and rows of each pipeline stage to stderr on exit")
+    args = parser.parse_args(argv)
+
+    instrument.setup_logging(args.verbose)
+    metrics = None
+    if args.metrics or args.verbose > 1:
+        metrics = instrument.enable()
+    index = cli.load_index(args)
+    try:
+        asyncio.run(serve(index, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.metrics:
+            print(metrics.report(), file=sys.stderr)
+        if metrics is not None:
+            instrument.disable()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+SQLite copy of the feed and speed database.
+
+    python sqlstore.py [ods or csv ...] [-o sqlite]
+
+imports every sheet of the spreadsheets, and any vendor CSVs, into one
+SQLite file in the canonical schema (see schema.py), with a composite
+index on the selection, DOC and diameter, so lookups only read the rows
+they need.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+
+from cache import LRUCache
+from lookup import CACHE_SIZE, ReadOnlyIndex, Leaf
+import database
+import schema
+
+SQLITE_PATH = os.path.join(database.DATA_DIR, "feed_speed_database.sqlite")
+LEAF_CACHE_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds_speeds (
+    id INTEGER PRIMARY KEY,
+    sheet TEXT NOT NULL,
+    family TEXT NOT NULL,
+    species TEXT NOT NULL,
+    hardness REAL,
+    operation TEXT NOT NULL,
+    tool_material TEXT NOT NULL,
+    doc REAL, -- NULL means any DOC
+    diameter REAL NOT NULL,
+    feed REAL NOT NULL,
+    speed REAL NOT NULL
+);
+-- NULLs are all distinct to UNIQUE, so any-DOC rows are indexed as -1
+CREATE UNIQUE INDEX IF NOT EXISTS feeds_speeds_selection
+    ON feeds_speeds (family, species, tool_material, operation, ifnull(doc, -1), diameter);
+"""
+
+INSERT_COLUMNS = ['sheet'] + schema.COLUMNS
+INSERT_BATCH = 5000
+
+
+def import_sources(paths, db_path=SQLITE_PATH):
+    """
+    (Re)create db_path from every sheet of the given spreadsheets and CSVs.
+
+    Rows are streamed in through schema.ingest and inserted in batches. The
+    selection index is unique, so a row that repeats an earlier source's
+    selection, DOC and diameter is dropped. Returns (rows read, rows kept).
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    sql = "INSERT OR IGNORE INTO feeds_speeds ({}) VALUES ({})".format(
+        ", ".join(INSERT_COLUMNS), ", ".join("?" * len(INSERT_COLUMNS)))
+    try:
+        conn.executescript(SCHEMA)
+        count = 0
+        batch = []
+        for source, row in schema.ingest(paths):
+            batch.append((source,) + row)
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        conn.executemany(sql, batch)
+        count += len(batch)
+        conn.commit()
+        kept = conn.execute("SELECT COUNT(*) FROM feeds_speeds").fetchone()[0]
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return count, kept
+
+
+def import_ods(ods_path=database.DATABASE_PATH, db_path=SQLITE_PATH):
+    return import_sources([ods_path], db_path)
+
+
+class SQLStore(ReadOnlyIndex):
+    """
+    Read-only index backed by the SQLite database instead of an in-memory tree.
+
+    Only the leaves that are queried are read, through the composite index,
+    and the most recent ones are kept in an LRU cache.
+    """
+    def __init__(self, path=SQLITE_PATH, cache_size=CACHE_SIZE, mode='clamp',
+                 leaf_cache_size=LEAF_CACHE_SIZE):
+        ReadOnlyIndex.__init__(self, cache_size=cache_size, mode=mode)
+        self.path = path
+        self.leaves = LRUCache(leaf_cache_size)
+        # shared with the GUI's worker thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    def families(self):
+        return [r[0] for r in self.query("SELECT DISTINCT family FROM feeds_speeds ORDER BY family")]
+
+    def species(self, family):
+        return [r[0] for r in self.query(
+            "SELECT DISTINCT species FROM feeds_speeds WHERE family = ? ORDER BY species", (family,))]
+
+    def tool_materials(self, family, species=None):
+        sql = "SELECT DISTINCT tool_material FROM feeds_speeds WHERE family = ?"
+        params = [family]
+        if species is not None:
+            sql += " AND species = ?"
+            params.append(species)
+        return [r[0] for r in self.query(sql + " ORDER BY tool_material", params)]
+
+    def operations(self, family, species=None, tool_material=None):
+        sql = "SELECT DISTINCT operation FROM feeds_speeds WHERE family = ?"
+        params = [family]
+        if species is not None:
+            sql += " AND species = ?"
+            params.append(species)
+        if tool_material is not None:
+            sql += " AND tool_material = ?"
+            params.append(tool_material)
+        return [r[0] for r in self.query(sql + " ORDER BY operation", params)]
+
+    def selections(self):
+        return iter(self.query("SELECT DISTINCT family, species, tool_material, operation "
+                               "FROM feeds_speeds"))
+
+    def leaf(self, family, species, tool_material, operation):
+        key = (family, species, tool_material, operation)
+        leaf = self.leaves.get(key)
+        if leaf is None:
+            rows = self.query(
+                "SELECT doc, diameter, feed, speed FROM feeds_speeds "
+                "WHERE family = ? AND species = ? AND tool_material = ? AND operation = ? "
+                "ORDER BY doc, diameter, id", key)
+            if not rows:
+                return None
+            leaf = Leaf(rows)
+            self.leaves.put(key, leaf)
+        return leaf
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import feed and speed data into SQLite")
+    parser.add_argument("sources", nargs="*", default=[database.DATABASE_PATH],
+                        help="spreadsheets (every sheet) and vendor CSVs, earlier ones win on duplicates")
+    parser.add_argument("-o", "--output", default=SQLITE_PATH, help="SQLite file to write")
+    args = parser.parse_args(argv)
+
+    count, kept = import_sources(args.sources, args.output)
+    print("Imported {} rows into {} ({} duplicates dropped)".format(kept, args.output, count - kept))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
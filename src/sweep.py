@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Feed, speed and power for a whole job-planning sweep, on every core.
+
+    python sweep.py --material wood --docs .05,.1,.25 --wocs .125,.25 -o sweep.csv
+    python sweep.py --diameters .125,.25,.5 --max-rpm 18000 --hp 3 -o sweep.parquet
+
+Every selection in the database (narrowed by --material, --species and
+--operation) is crossed with every tool in the crib, each tool's diameter
+(or every --diameters value), every DOC and every WOC. DOC and WOC default
+to the diameter, a full slot, as in MachineTable.
+
+The sweep is split into tasks of about TASK_ROWS results and run on a
+ProcessPoolExecutor. The index is written once as a mapstore file (unless
+it already is one) that every worker memory-maps, so the workers share one
+copy through the page cache instead of each unpickling the index. Results are written as
+tasks finish (so rows come out in no particular order), to CSV, or to
+Parquet when the output ends in .parquet (needs pyarrow).
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import cli
+from crib import CRIB_PATH, ToolCrib
+from machine_table import COLUMNS, DEFAULT_TOOLS
+from mapstore import MappedStore, write_store
+from operation import calc_batch, calc_power_batch
+
+log = logging.getLogger(__name__)
+
+TASK_ROWS = 200000 # results per task, big enough to hide the pool overhead
+PENDING = 2 # tasks queued per worker, bounds the results held in memory
+FLOAT_FORMAT = '%.10g' # CSV formatting is most of a task's time, and this is faster than repr
+
+
+class Sweep():
+    """
+    The sweep settings, shared by every task. docs, wocs and diameters are
+    lists of values, or None for the tool's diameter.
+    """
+    def __init__(self, tools, docs=None, wocs=None, diameters=None, max_rpm=None, HP=None,
+                 E=1.0, hardness=0):
+        self.tools = tools
+        self.docs = docs
+        self.wocs = wocs
+        self.diameters = diameters
+        self.max_rpm = max_rpm
+        self.HP = HP
+        self.E = E
+        self.hardness = hardness
+
+    def rows_per_tool(self):
+        return len(self.diameters or [0]) * len(self.docs or [0]) * len(self.wocs or [0])
+
+    def tasks(self, index, family=None, species=None, operation=None):
+        """
+        Yield (selection, tool numbers) tasks of at most about TASK_ROWS rows.
+        """
+        per_task = max(1, TASK_ROWS // self.rows_per_tool())
+        for selection in index.selections():
+            fam, sp, tool_material, op = selection
+            if family not in (None, fam) or species not in (None, sp) or operation not in (None, op):
+                continue
+            matching = [i for i, t in enumerate(self.tools)
+                        if t.material in (None, tool_material) and (t.D or self.diameters)]
+            for start in range(0, len(matching), per_task):
+                yield selection, matching[start:start + per_task]
+
+    def run(self, index, selection, tool_numbers):
+        """
+        Evaluate one task. Returns {column: array} with COLUMNS of
+        machine_table, the text columns as single strings.
+        """
+        family, species, tool_material, operation = selection
+        tools = [self.tools[i] for i in tool_numbers]
+
+        # every tool x diameter x DOC x WOC, flattened in that order
+        if self.diameters:
+            D = np.repeat(np.array(self.diameters, dtype=float)[None, :], len(tools), axis=0)
+        else:
+            D = np.array([[t.D] for t in tools], dtype=float)
+        names = np.repeat(np.array([t.name for t in tools], dtype=object), D.shape[1])
+        nt = np.repeat(np.array([t.nt for t in tools], dtype=float), D.shape[1])
+        D = D.ravel()
+        ndoc = len(self.docs or [0])
+        nwoc = len(self.wocs or [0])
+        doc = np.broadcast_to(D[:, None] if self.docs is None else np.array(self.docs, dtype=float),
+                              (len(D), ndoc))
+        woc = np.broadcast_to(D[:, None] if self.wocs is None else np.array(self.wocs, dtype=float),
+                              (len(D), nwoc))
+        doc = np.repeat(doc, nwoc, axis=1).ravel()
+        woc = np.tile(woc, (1, ndoc)).ravel()
+        repeat = ndoc * nwoc
+        names = np.repeat(names, repeat)
+        nt = np.repeat(nt, repeat)
+        D = np.repeat(D, repeat)
+
+        f, ss = index.feed_speed_batch(family, species, tool_material, operation, doc, D)
+        N, fm, _ = calc_batch(D, nt, ss, f, max_rpm=self.max_rpm)
+        Q, Pm, percent = calc_power_batch(fm, woc, doc, self.kp(family, species), self.E, self.HP)
+
+        return {'family': family, 'species': species, 'tool_material': tool_material,
+                'operation': operation, 'name': names, 'D': D, 'nt': nt, 'doc': doc, 'woc': woc,
+                'f': f, 'ss': ss, 'N': N, 'fm': fm, 'Q': Q, 'Pm': Pm, 'percent_power': percent}
+
+    def kp(self, family, species):
+        from power import get_power_table
+
+        power_table = get_power_table()
+        return float(power_table.kp(power_table.find(species, family), self.hardness))
+
+
+def to_frame(columns):
+    import pandas as pd
+
+    return pd.DataFrame({name: columns[name] for name in COLUMNS})
+
+
+# state of a pool worker, set up once by init_worker
+_worker = None
+
+
+def init_worker(path, mode, sweep, fmt):
+    global _worker
+    _worker = (MappedStore(path, cache_size=0, mode=mode), sweep, fmt)
+
+
+def worker_task(selection, tool_numbers):
+    index, sweep, fmt = _worker
+    return encode(sweep.run(index, selection, tool_numbers), fmt)
+
+
+def encode(columns, fmt):
+    """
+    A task's result as the writer takes it: CSV text, formatted in the
+    worker so the parent only writes, or a DataFrame for Parquet.
+    """
+    frame = to_frame(columns)
+    if fmt == 'csv':
+        return frame.to_csv(header=False, index=False, float_format=FLOAT_FORMAT)
+    return frame
+
+
+class CSVWriter():
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='')
+        self.file.write(",".join(COLUMNS) + "\n")
+
+    def write(self, text):
+        self.file.write(text)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter():
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.writer = None
+        self.pq = pq
+
+    def write(self, frame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def output_format(path):
+    return 'parquet' if path.endswith('.parquet') else 'csv'
+
+
+def run_sweep(index, sweep, output, family=None, species=None, operation=None, workers=None):
+    """
+    Run the sweep over index and write it to output. Returns the number of
+    rows written. With one worker everything runs in this process.
+    """
+    fmt = output_format(output)
+    writer = ParquetWriter(output) if fmt == 'parquet' else CSVWriter(output)
+    tasks = sweep.tasks(index, family, species, operation)
+    workers = workers or os.cpu_count() or 1
+    rows = 0
+    try:
+        if workers == 1:
+            for selection, tool_numbers in tasks:
+                result = sweep.run(index, selection, tool_numbers)
+                rows += len(result['D'])
+                writer.write(encode(result, fmt))
+            return rows
+
+        with tempfile.TemporaryDirectory() as workdir:
+            if isinstance(index, MappedStore):
+                path = index.path
+            else:
+                path = os.path.join(workdir, "index.vsdb")
+                write_store(index, path)
+            with concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=init_worker,
+                    initargs=(path, index.mode, sweep, fmt)) as pool:
+                pending = set()
+                for task in tasks:
+                    pending.add(pool.submit(worker_task, *task))
+                    if len(pending) >= PENDING * workers:
+                        done, pending = concurrent.futures.wait(
+                            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        rows += write_done(writer, done)
+                rows += write_done(writer, concurrent.futures.as_completed(pending))
+        return rows
+    finally:
+        writer.close()
+
+
+def write_done(writer, futures):
+    rows = 0
+    for future in futures:
+        result = future.result()
+        rows += result.count("\n") if isinstance(result, str) else len(result)
+        writer.write(result)
+    log.info("%d rows written", rows)
+    return rows
+
+
+def load_tools(path):
+    """
+    The tools of a crib file, or DEFAULT_TOOLS if it has none.
+    """
+    return ToolCrib(path or CRIB_PATH).load().tools or DEFAULT_TOOLS
+
+
+def parse_list(text):
+    if text is None:
+        return None
+    return [float(s) for s in text.split(",") if s.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feed, speed and power for a job-planning sweep")
+    cli.add_database_arguments(parser)
+    parser.add_argument("--material", help="only this material family")
+    parser.add_argument("--species", help="only this species")
+    parser.add_argument("--operation", help="only this operation")
+    parser.add_argument("--crib", help="tool crib JSON (default: the GUI's crib, or common router bits)")
+    parser.add_argument("--diameters", help="comma separated diameters to run every tool at (in)")
+    parser.add_argument("--docs", help="comma separated depths of cut (in), default the diameter")
+    parser.add_argument("--wocs", help="comma separated widths of cut (in), default the diameter")
+    parser.add_argument("--max-rpm", type=float, help="spindle max RPM")
+    parser.add_argument("--hp", type=float, help="spindle horsepower, for percent_power")
+    parser.add_argument("--efficiency", type=float, default=1.0,
+                        help="machine tool efficiency factor (default: %(default)s)")
+    parser.add_argument("--hardness", type=float, default=0, help="workpiece Brinell hardness")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="CSV, or Parquet if it ends in .parquet (default: CSV on stdout)")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args(argv)
+    if output_format(args.output) == 'parquet':
+        # checked now rather than when the first task's results come back
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            parser.error("writing Parquet needs pyarrow: pip install pyarrow (or .[parquet])")
+
+    from instrument import setup_logging
+    setup_logging(args.verbose)
+    index = cli.load_index(args)
+    sweep = Sweep(load_tools(args.crib), parse_list(args.docs), parse_list(args.wocs),
+                  parse_list(args.diameters), args.max_rpm, args.hp, args.efficiency, args.hardness)
+
+    start = time.perf_counter()
+    rows = run_sweep(index, sweep, args.output, args.material, args.species, args.operation,
+                     args.workers)
+    elapsed = time.perf_counter() - start
+    print("{} rows in {:.1f} s ({:.0f} rows/s)".format(rows, elapsed, rows / elapsed if elapsed else 0),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
 class Tool():
-    def __init__(self, diameter=None, flutes=1, material=None):
+    def __init__(self, diameter=None, flutes=1, material=None, name=''):
+        self.name = name
         self.D = diameter # Diameter (inches)
         self.flutes = flutes # Number of flutes
         self.nt = flutes
@@ -14,3 +15,13 @@ class Tool():
 
     def adjust_sf(self):
         pass
+
+    def to_dict(self):
+        return {"name": self.name, "D": self.D, "flutes": self.nt,
+                "stickout": self.stickout, "material": self.material}
+
+    @classmethod
+    def from_dict(cls, d):
+        tool = cls(d.get("D"), d.get("flutes", 1), d.get("material"), d.get("name", ''))
+        tool.stickout = d.get("stickout", 0.0)
+        return tool
@@ -1,35 +1,70 @@
 #!/usr/bin/env python3
-import yaml
-import math
 import numpy as np
 import sys
-import os
-import csv
-import pandas as pd
+import argparse
+import logging
+import database
+import instrument
 from tool import Tool
 from material import Material
 from operation import Operation
-
-from PyQt5.QtWidgets import QMainWindow, QGraphicsView, QFileDialog, QApplication, QMessageBox
+from machine import Spindle, Machine, load_machines, save_machines
+from machine_table import MachineTable, DEFAULT_TOOLS
+from crib import ToolCrib
+from lookup import LookupIndex, ReadOnlyIndex
+from sqlstore import SQLStore
+from mapstore import MappedStore
+from postprocess.plotter import Chart, Curves, material_curves
+
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtWidgets import QMainWindow, QGraphicsView, QFileDialog, QApplication, QMessageBox, \
+    QLabel, QLineEdit, QComboBox, QPushButton, QTableWidget, QTableWidgetItem, QWidget, QVBoxLayout
 from mainwindow import Ui_vsfeedspeedgui
+from worker import LookupWorker
+from recompute import RecomputeGraph
+from watcher import FileWatcher
+
+log = logging.getLogger(__name__)
+
+DEBOUNCE_MS = 150
+
+MACHINE_TABLE_HEADERS = [("Tool", 'name'), ("Species", 'species'), ("Tool Material", 'tool_material'),
+                         ("Operation", 'operation'), ("Diameter", 'D'), ("Teeth", 'nt'),
+                         ("Chipload", 'f'), ("RPM", 'N'), ("Feedrate", 'fm'), ("Power %", 'percent_power')]
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, app):
+    def __init__(self, app, rebuild_cache=False, db_path=None, map_path=None,
+                 database_path=database.DATABASE_PATH, watch=True):
         QMainWindow.__init__(self)
         self.app = app
+        self.rebuild_cache = rebuild_cache
+        self.db_path = db_path
+        self.map_path = map_path
+        self.database_path = database_path
         self.ui = Ui_vsfeedspeedgui()
         self.ui.setupUi(self)
 
         self.tool = Tool()
         self.material = Material()
         self.operation = Operation(self.tool, self.material)
+        self.spindle = Spindle()
+
+        self.worker = LookupWorker(ReadOnlyIndex.feed_speed, self)
+        self.worker.result_ready.connect(self.set_lookup_result)
+        self.build_graph()
 
         # self.load_materials()
         self.load_table()
+        self.setup_crib()
+        self.setup_machines()
         self.connect_signals()
+        self.setup_chart()
+        if watch:
+            self.setup_reload()
 
     def load_materials(self):
+        import yaml
 
         with open("cutting_feed_speed_for_milling_aluminum.yaml", "r") as stream:
             try:
@@ -39,15 +74,79 @@ class MainWindow(QMainWindow):
                 for key, value in self.material_dict['materials'].items():
                     self.materials.append(key)
             except yaml.YAMLError as exc:
-                print(exc)
+                log.error(exc)
 
     def load_table(self):
+        self.table_data, self.index = self.read_index(rebuild=self.rebuild_cache)
+        self.materials = self.index.families()
+        log.info("materials: %s", self.materials)
+
+    def read_index(self, previous=None, rebuild=False):
+        """
+        Load the database and index it. Safe to run off the GUI thread.
+        """
+        if self.map_path:
+            # shared with every other instance through the page cache
+            return None, MappedStore(self.map_path)
+        if self.db_path:
+            # all sheets, read from SQLite as needed
+            return None, SQLStore(self.db_path)
+        table_data = database.load_table(self.database_path, sheet_name='non-metals', rebuild=rebuild)
+        return table_data, LookupIndex(table_data, previous=previous)
+
+    def setup_reload(self):
+        """
+        Watch the database file and swap in a fresh index when it's edited,
+        without restarting. The index is rebuilt on its own worker thread
+        and only leaves whose rows changed are rebuilt.
+        """
+        self.reloader = LookupWorker(self.read_index, self)
+        self.reloader.result_ready.connect(self.swap_index)
+        self.watcher = FileWatcher(self.map_path or self.db_path or self.database_path, parent=self)
+        self.watcher.changed.connect(self.reload_index)
 
-        self.table_data = pd.read_excel("./data/feed_speed_database.ods", engine="odf", sheet_name='non-metals')
+    def reload_index(self, path=None):
+        log.info("reloading %s", path or self.map_path or self.db_path or self.database_path)
+        self.reloader.submit(self.index)
 
-        no_dupes = self.table_data.drop_duplicates(subset=['Material Family'])
-        self.materials = no_dupes['Material Family']
-        print(self.materials)
+    def swap_index(self, result):
+        """
+        Replace the index with a rebuilt one, keeping the current material,
+        species, tool material and operation where they still exist.
+        """
+        if result is None:
+            # load failed (e.g. a half saved file), keep the old index
+            return
+        old_index = self.index
+        self.table_data, self.index = result
+        # a lookup may still be using the old store's connection or mapping
+        self.worker.cancel()
+        old_index.close()
+        log.info("reindexed %s selections", getattr(self.index, 'rebuilt', 'all'))
+
+        self.materials = self.index.families()
+        family = restore_combo(self.ui.material_combo_box, self.materials)
+        if self.material.family is not None:
+            if family != self.material.family:
+                self.material.reset()
+                self.material.set_material(family)
+            species = restore_combo(self.ui.material_species_combo_box,
+                                    self.index.species(self.material.family))
+            tool_material = restore_combo(self.ui.tool_material_combo_box,
+                                          self.index.tool_materials(self.material.family))
+            operation = restore_combo(self.ui.operation_combo_box,
+                                      self.index.operations(self.material.family))
+            if self.material.species is not None:
+                self.material.species = species
+            if self.tool.material is not None:
+                self.tool.material = tool_material
+            if self.operation.operation is not None:
+                self.operation.operation = operation
+
+        self.build_machine_tables()
+        self.populate_machine_table()
+        self.graph.mark_all()
+        self.debounce.start()
 
 
     def connect_signals(self):
@@ -66,137 +165,160 @@ class MainWindow(QMainWindow):
         self.ui.operation_combo_box.textActivated.connect(self.set_operation)
         self.ui.doc_input.textChanged['QString'].connect(self.set_doc)
         self.ui.woc_input.textChanged['QString'].connect(self.set_woc)
+        self.ui.lineEdit_12.textChanged['QString'].connect(self.set_hardness)
+        self.ui.lineEdit_13.textChanged['QString'].connect(self.set_spindle_hp)
+        self.ui.lineEdit_14.textChanged['QString'].connect(self.set_spindle_efficiency)
 
         self.initialize_values()
 
     def initialize_values(self):
         self.ui.tool_teeth_input.setText("1")
+        self.ui.woc_input.setText(str(self.operation.w))
+        self.ui.lineEdit_14.setText(str(self.spindle.E))
 
     def populate_tool_materials(self):
-        tool_materials = set(self.filtered_df['Tool Material'].tolist())
-        for mat in tool_materials:
+        self.ui.tool_material_combo_box.clear()
+        for mat in self.index.tool_materials(self.material.family):
             self.ui.tool_material_combo_box.addItem(mat)
 
     def populate_operations(self):
-        operations = set(self.filtered_df['Operation'].tolist())
-        for op in operations:
+        self.ui.operation_combo_box.clear()
+        for op in self.index.operations(self.material.family):
             self.ui.operation_combo_box.addItem(op)
 
-    def filter_materials(self, df):
-        print("filtering materials...")
-        filtered_df = df[df['Material Family'] == self.material.family]
-        self.filtered_df = filtered_df
+    def build_graph(self):
+        """
+        Each stage only re-runs when an input it depends on changes, e.g.
+        changing the flute count recalculates the feedrate but does not
+        repeat the table lookup.
+        """
+        self.graph = RecomputeGraph()
+        self.graph.add_stage('lookup', self.apply_filters,
+                             ['family', 'species', 'tool_material', 'operation', 'doc', 'D'])
+        self.graph.add_stage('speed', self.update_speed, ['lookup', 'D', 'spindle'])
+        self.graph.add_stage('feedrate', self.update_feedrate, ['speed', 'nt'])
+        self.graph.add_stage('power', self.update_power,
+                             ['feedrate', 'woc', 'doc', 'family', 'species', 'hardness', 'spindle'])
+        self.graph.add_stage('chart', self.update_chart, ['feedrate'])
+        self.graph.add_stage('crib_sheet', self.update_live_machine_table, ['spindle'])
+        self.graph.add_stage('crib_hardness', self.update_machine_tables, ['hardness'])
+        self.have_feed_speed = False
+
+        # wait for typing to pause before recalculating
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.run_graph)
+
+    def run_graph(self):
+        with instrument.stage('ui_update'):
+            self.graph.run()
+
+    def changed(self, name):
+        self.graph.mark(name)
+        self.debounce.start()
 
     def apply_filters(self):
-        self.ui.feedrate_display.setText("N/A")
+        """
+        Queue a lookup for the current inputs on the worker thread.
+        """
+        self.worker.submit(self.index, self.material.family, self.material.species,
+                           self.tool.material, self.operation.operation,
+                           self.operation.doc, self.tool.D)
+        return False
+
+    def set_lookup_result(self, result):
+        self.have_feed_speed = result is not None
+        if self.have_feed_speed:
+            self.operation.f, self.operation.ss = result
+        with instrument.stage('ui_update'):
+            self.graph.resolve('lookup')
+
+    def update_speed(self):
         self.ui.speed_display.setText("N/A")
+        if not self.have_feed_speed or not self.tool.D:
+            return
+        self.operation.calc_RPM(self.spindle.max_rpm)
+        self.ui.speed_display.setText(str(self.operation.N))
 
-        # self.table_data = self.table_data.filter(like=material, axis=0)
-        filtered_df = self.table_data
-        # filtered_df = filtered_df[filtered_df['Material Family'] == self.material.family]
-        # filtered_df = filtered_df[filtered_df['DOC'] > self.operation.doc]
-
-        if self.material.species:
-            filtered_df = filtered_df[filtered_df['material species'] == self.material.species]
-
-        # filter tools
-        if self.tool.material:
-            filtered_df = filtered_df[filtered_df['Tool Material'] == self.tool.material]
-
-        try:
-            filtered_df = filtered_df[filtered_df['Operation'] == self.operation.operation]
-        except:
-            pass
-
-        filtered_df = self.filter_doc(filtered_df)
-        filtered_df = self.filter_diameter(filtered_df)
-
-        print("\nThere are {} results.".format(len(filtered_df)))
-        print(filtered_df)
-        self.filtered_df = filtered_df
-
-
-
-        if len(filtered_df) == 2:
-            self.interp_results(filtered_df)
-        elif len(filtered_df) == 1:
-            self.operation.f = float(filtered_df['Feed'])
-            self.operation.ss = float(filtered_df['Speed'])
-
+    def update_feedrate(self):
+        self.ui.feedrate_display.setText("N/A")
+        if not self.have_feed_speed or not self.tool.D:
+            return
+        self.operation.calc_feedrate(self.spindle.max_rpm)
+        self.ui.feedrate_display.setText(str(self.operation.fm))
 
-        try:
-            self.set_feed_and_speed(filtered_df)
-        except Exception as e:
-            print("cannot calc feed and speed", e)
-
-        # try:
-        #     self.operation.calc_RPM()
-        #     self.operation.calc_feedrate()
-        #     self.ui.feedrate_display.setText(str(self.operation.fm))
-        #     self.ui.speed_display.setText(str(self.operation.N))
-        # except Exception as e:
-        #     print("operation feedrate unknown", e)
-
-    def interp_results(self, df):
-        diameters = df['Cutter Diameter'].tolist()
-        feeds = df['Feed'].tolist()
-        speeds = df['Speed'].tolist()
-
-        feed = np.interp(self.tool.D, diameters, feeds)
-        speed = np.interp(self.tool.D, diameters, speeds)
-        self.operation.f = round(feed, 4)
-        self.operation.ss = round(speed, 4)
-
-    def filter_doc(self, df):
+    def update_power(self):
+        self.ui.power_display.setText("N/A")
+        if not self.have_feed_speed or not self.tool.D:
+            return
+        self.operation.calc_power(self.spindle)
+        if np.isnan(self.operation.Pm):
+            return
+        text = "{:.2f} HP".format(self.operation.Pm)
+        if not np.isnan(self.operation.percent_power):
+            text += " ({:.0f}%)".format(self.operation.percent_power)
+        self.ui.power_display.setText(text)
+
+    def setup_chart(self):
         """
-        Depth of Cut
+        Feedrate vs RPM for the current tool, under the results. Optional,
+        skipped when matplotlib isn't installed.
         """
+        self.chart = None
         try:
-            no_dupes = df.drop_duplicates(subset=['DOC'])
-            no_dupes = no_dupes.dropna(subset=['DOC'])
-            docs = no_dupes['DOC'].tolist()
-            doc_low = find_nearest_low(docs, self.operation.doc)
-            doc_high = find_nearest_high(docs, self.operation.doc)
-            df = df[(df['DOC'] == doc_low) | (df['DOC'] == doc_high)]
-        except Exception as e:
-            print("cant calc doc", e)
-        return df
-
-    def filter_diameter(self, df):
-        try:
-            no_dupes = df.drop_duplicates(subset=['Cutter Diameter'])
-            no_dupes = no_dupes.dropna(subset=['Cutter Diameter'])
-            diams = no_dupes['Cutter Diameter'].tolist()
-            diam_low = find_nearest_low(diams, self.tool.D)
-            diam_high = find_nearest_high(diams, self.tool.D)
-            print(diam_low, diam_high)
-            df = df[(df['Cutter Diameter'] == diam_low) | (df['Cutter Diameter'] == diam_high)]
-        except Exception as e:
-            print("cant calc cutter diameter", e)
-        return df
-
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+        except ImportError:
+            return
+        fig = Figure(figsize=(2.4, 1.8), dpi=72)
+        self.chart_canvas = FigureCanvasQTAgg(fig)
+        self.chart_canvas.setParent(self.ui.frame)
+        self.chart_canvas.setGeometry(QRect(5, 200, 241, 186))
+        self.chart = Chart(fig.add_subplot(1, 1, 1))
+        fig.subplots_adjust(left=0.25, bottom=0.2)
+
+    def update_chart(self):
+        """
+        The chart's lines are moved in place, see plotter.Chart, and the
+        canvas redraws when the GUI is next idle.
+        """
+        if self.chart is None:
+            return
+        if not self.have_feed_speed or not self.tool.D:
+            curves = Curves("Feedrate vs RPM", "RPM", "Feedrate (in/min)", [],
+                            np.empty((0, 2)), np.empty((0, 2)))
+            point = None
+        else:
+            tool = Tool(self.tool.D, self.tool.nt, self.tool.material, "{:g} in".format(self.tool.D))
+            curves = material_curves(self.index, self.material.family, self.material.species,
+                                     [tool], self.spindle, self.material.hardness,
+                                     operation=self.operation.operation)['feed_vs_rpm']
+            point = (self.operation.N, self.operation.fm)
+        self.chart.update(curves, point)
+        self.chart_canvas.draw_idle()
 
     def set_material_family(self):
-        # if work material changes, reset the df filters. Otherwise species disappear
-        print("\n\nmaterial family changed!\n\n")
-        self.filtered_df = self.table_data
+        # if work material changes, reset the selections. Otherwise species disappear
+        log.debug("material family changed")
 
         self.material.reset()
         self.material.set_material(self.ui.material_combo_box.currentText())
-        self.filter_materials(self.filtered_df)
         self.populate_species()
+        self.populate_machine_table()
+        self.changed('family')
 
     def populate_species(self):
         # given the current material family selection, populate dropdown with all possible species
         self.ui.material_species_combo_box.clear()
-        species = set(self.filtered_df['material species'].tolist())
-        for s in species:
+        for s in self.index.species(self.material.family):
             self.ui.material_species_combo_box.addItem(s)
 
     def set_material_species(self):
-        print("SET MATERIAL SPECIES")
+        log.debug("material species changed")
         self.material.species = self.ui.material_species_combo_box.currentText()
-        self.apply_filters()
+        self.populate_machine_table()
+        self.changed('species')
 
 
     def set_diameter(self):
@@ -206,86 +328,280 @@ class MainWindow(QMainWindow):
 
         try:
             self.tool.D = float(d)
-            # update DOC accordingly
-            self.set_doc(self.tool.D)
-        except:
-            pass
-        self.apply_filters()
+        except ValueError:
+            return
+        self.changed('D')
+        # update DOC accordingly
+        self.ui.doc_input.setText(str(self.tool.D))
 
     def set_teeth(self):
         t = self.ui.tool_teeth_input.displayText()
         if not t:
             t = 1
-        self.tool.nt = float(t)
-        self.update()
+        try:
+            self.tool.nt = float(t)
+        except ValueError:
+            return
+        self.changed('nt')
 
     def set_tool_material(self):
-        # self.tool_material = self.op['tool_materials']["HSS"]
         self.tool.material = self.ui.tool_material_combo_box.currentText()
-        self.apply_filters()
+        self.changed('tool_material')
 
     def set_operation(self):
         self.operation.operation = self.ui.operation_combo_box.currentText()
-        self.apply_filters()
+        self.populate_machine_table()
+        self.changed('operation')
 
-    def set_doc(self, doc=None):
-        if doc == None:
-            doc = float(self.ui.doc_input.displayText())
-        else:
-            self.ui.doc_input.setText(str(doc))
+    def set_doc(self):
         try:
-            self.operation.doc = doc
-            self.apply_filters()
-        except:
-            pass
+            self.operation.doc = float(self.ui.doc_input.displayText())
+        except ValueError:
+            return
+        self.changed('doc')
 
     def set_woc(self):
         try:
             self.operation.w = float(self.ui.woc_input.displayText())
-        except:
-            pass
-
-    def set_feed_and_speed(self, df):
-        """
-        Interpolate the feed and speed, then set them in the display.
-        """
-        print("\n\nSetting feed and speed\n\n")
-
-        if len(df) == 2:
-            diameters = df['Cutter Diameter'].tolist()
-            feeds = df['Feed'].tolist()
-            speeds = df['Speed'].tolist()
-            feed = np.interp(self.tool.D, diameters, feeds)
-            speed = np.interp(self.tool.D, diameters, speeds)
-            self.operation.f = round(feed, 4)
-            self.operation.ss = round(speed, 4)
-        elif len(df) == 1:
-            self.operation.f = float(df['Feed'])
-            self.operation.ss = float(df['Speed'])
-        else:
-            print("Too many results.")
-
-        self.operation.calc_RPM()
-        self.operation.calc_feedrate()
-
-        self.ui.feedrate_display.setText(str(self.operation.fm))
-        self.ui.speed_display.setText(str(self.operation.N))
-
-
-    def update(self):
-        self.apply_filters()
-
-
-
-
+        except ValueError:
+            return
+        self.changed('woc')
 
+    def set_hardness(self):
+        try:
+            self.material.hardness = float(self.ui.lineEdit_12.displayText())
+        except ValueError:
+            return
+        self.changed('hardness')
 
+    def set_spindle_hp(self):
+        try:
+            self.spindle.HP = float(self.ui.lineEdit_13.displayText())
+        except ValueError:
+            return
+        self.changed('spindle')
 
+    def set_spindle_efficiency(self):
+        try:
+            self.spindle.E = float(self.ui.lineEdit_14.displayText())
+        except ValueError:
+            return
+        self.changed('spindle')
 
+    def set_spindle_max_rpm(self):
+        try:
+            self.spindle.max_rpm = float(self.max_rpm_input.displayText())
+        except ValueError:
+            return
+        self.changed('spindle')
 
+    def setup_machines(self):
+        """
+        Machine profiles live on the Machine tab. Each profile's feed, speed
+        and power table is precomputed up front, so selecting a machine only
+        swaps tables.
+        """
+        tab = self.ui.machine_tab
+        label = QLabel("Max RPM", tab)
+        label.setGeometry(QRect(20, 120, 81, 31))
+        self.max_rpm_input = QLineEdit(tab)
+        self.max_rpm_input.setGeometry(QRect(110, 120, 167, 25))
+        label = QLabel("Profile", tab)
+        label.setGeometry(QRect(20, 160, 81, 31))
+        self.machine_combo_box = QComboBox(tab)
+        self.machine_combo_box.setGeometry(QRect(110, 160, 167, 25))
+        self.machine_combo_box.setEditable(True)
+        self.save_machine_button = QPushButton("Save Profile", tab)
+        self.save_machine_button.setGeometry(QRect(110, 200, 167, 25))
+
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        self.machine_table_widget = QTableWidget(page)
+        self.machine_table_widget.setColumnCount(len(MACHINE_TABLE_HEADERS))
+        self.machine_table_widget.setHorizontalHeaderLabels([h for h, _ in MACHINE_TABLE_HEADERS])
+        layout.addWidget(self.machine_table_widget)
+        self.machine_table_widget.setSortingEnabled(True)
+        self.ui.tabWidget.addTab(page, "Crib Sheet")
+
+        self.machines = load_machines()
+        self.machine_tables = {}
+        for machine in self.machines:
+            self.machine_combo_box.addItem(machine.name)
+        self.build_machine_tables()
+
+        self.max_rpm_input.textChanged['QString'].connect(self.set_spindle_max_rpm)
+        self.machine_combo_box.textActivated.connect(self.set_machine)
+        self.save_machine_button.clicked.connect(self.save_machine)
+
+    def find_machine(self, name):
+        for machine in self.machines:
+            if machine.name == name:
+                return machine
+        return None
+
+    def set_machine(self, name):
+        machine = self.find_machine(name)
+        if machine is None:
+            return
+        self.ui.lineEdit_13.setText(str(machine.spindle.HP))
+        self.ui.lineEdit_14.setText(str(machine.spindle.E))
+        self.max_rpm_input.setText(str(machine.spindle.max_rpm))
+        self.machine_table = self.machine_tables[name]
+        self.populate_machine_table()
+
+    def save_machine(self):
+        name = self.machine_combo_box.currentText().strip()
+        if not name:
+            return
+        machine = self.find_machine(name)
+        if machine is None:
+            machine = Machine(name)
+            self.machines.append(machine)
+            self.machine_combo_box.addItem(name)
+        machine.spindle = Spindle.from_dict(self.spindle.to_dict())
+        save_machines(self.machines)
+        self.machine_tables[name] = self.make_machine_table(machine.spindle)
+        self.set_machine(name)
+
+    def make_machine_table(self, spindle, tools=None):
+        """
+        A crib sheet for spindle, with power at the selected material's hardness.
+        """
+        if tools is None:
+            tools = self.crib_tools()
+        return MachineTable(self.index, spindle, tools, self.material.hardness)
+
+    def build_machine_tables(self):
+        tools = self.crib_tools()
+        self.machine_tables = {}
+        for machine in self.machines:
+            self.machine_tables[machine.name] = self.make_machine_table(machine.spindle, tools)
+        machine = self.find_machine(self.machine_combo_box.currentText())
+        if machine is not None:
+            self.machine_table = self.machine_tables[machine.name]
+        else:
+            self.machine_table = self.make_machine_table(self.spindle, tools)
 
+    def update_live_machine_table(self):
+        """
+        Without a machine profile selected, the crib sheet is built from
+        the spindle fields, so it's rebuilt when they change.
+        """
+        if self.machine_table.spindle is not self.spindle:
+            return
+        self.machine_table = self.make_machine_table(self.spindle)
+        self.populate_machine_table()
 
+    def update_machine_tables(self):
+        """
+        Every crib sheet's power depends on the hardness, so all are rebuilt.
+        """
+        self.build_machine_tables()
+        self.populate_machine_table()
 
+    def populate_machine_table(self):
+        """
+        Show the current machine's precomputed rows for every crib tool that
+        fits the selected material and operation.
+        """
+        table = self.machine_table
+        rows = table.select(family=self.material.family, species=self.material.species,
+                            operation=self.operation.operation)
+        widget = self.machine_table_widget
+        widget.setSortingEnabled(False)
+        widget.setRowCount(len(rows))
+        for r, i in enumerate(rows):
+            for c, (_, name) in enumerate(MACHINE_TABLE_HEADERS):
+                value = table.columns[name][i]
+                item = QTableWidgetItem()
+                if isinstance(value, float):
+                    if np.isnan(value):
+                        item.setText("N/A")
+                    else:
+                        # sort numerically
+                        item.setData(Qt.DisplayRole, round(float(value), 4))
+                else:
+                    item.setText(str(value))
+                widget.setItem(r, c, item)
+        widget.setSortingEnabled(True)
+
+    def setup_crib(self):
+        """
+        The tool crib list on the Tool tab, with a name field and buttons to
+        save the current tool into the crib or remove the selected one.
+        """
+        self.crib = ToolCrib().load()
+
+        tab = self.ui.tool_tab
+        label = QLabel("Tool Name", tab)
+        label.setGeometry(QRect(30, 240, 81, 25))
+        self.tool_name_input = QLineEdit(tab)
+        self.tool_name_input.setGeometry(QRect(120, 240, 170, 25))
+        self.add_tool_button = QPushButton("Add to Crib", tab)
+        self.add_tool_button.setGeometry(QRect(30, 280, 125, 25))
+        self.remove_tool_button = QPushButton("Remove", tab)
+        self.remove_tool_button.setGeometry(QRect(165, 280, 125, 25))
+
+        self.populate_crib()
+        self.ui.listWidget_2.itemClicked.connect(self.select_crib_tool)
+        self.add_tool_button.clicked.connect(self.add_crib_tool)
+        self.remove_tool_button.clicked.connect(self.remove_crib_tool)
+
+    def crib_tools(self):
+        if len(self.crib):
+            return self.crib.tools
+        return DEFAULT_TOOLS
+
+    def populate_crib(self):
+        self.ui.listWidget_2.clear()
+        for tool in self.crib:
+            self.ui.listWidget_2.addItem(tool.name)
+
+    def select_crib_tool(self, item):
+        tool = self.crib.find(item.text())
+        if tool is None:
+            return
+        self.tool_name_input.setText(tool.name)
+        if tool.material:
+            self.ui.tool_material_combo_box.setCurrentText(tool.material)
+            self.set_tool_material()
+        self.ui.tool_teeth_input.setText("{:g}".format(tool.nt))
+        self.ui.tool_diameter_input.setText("{:g}".format(tool.D))
+
+    def add_crib_tool(self):
+        name = self.tool_name_input.text().strip()
+        if not name or not self.tool.D:
+            return
+        tool = Tool(self.tool.D, self.tool.nt, self.tool.material, name)
+        tool.stickout = self.tool.stickout
+        self.crib.add(tool)
+        self.crib_changed()
+
+    def remove_crib_tool(self):
+        item = self.ui.listWidget_2.currentItem()
+        if item is None:
+            return
+        self.crib.remove(item.text())
+        self.crib_changed()
+
+    def crib_changed(self):
+        self.crib.save()
+        self.populate_crib()
+        self.build_machine_tables()
+        self.populate_machine_table()
+
+
+def restore_combo(combo, items):
+    """
+    Refill a combo box, keeping its current text selected if it's still an
+    item. Returns the text now selected, or None if the combo is empty.
+    """
+    current = combo.currentText()
+    combo.clear()
+    combo.addItems(items)
+    if current in items:
+        combo.setCurrentText(current)
+    return combo.currentText() or None
 
 
 def calc_feedrate(material, tool):
@@ -300,37 +616,13 @@ def get_chipload(material, tool):
     diameters = list(material.material_dict[material.material]['chipload'].keys())
     chiploads = list(material.material_dict[material.material]['chipload'].values())
 
-    print(diameters, chiploads)
+    log.debug("%s %s", diameters, chiploads)
     chipload = np.interp(tool.diameter, diameters, chiploads)
     # for d, load in chiploads.items():
     #     if d < tool.diameter:
     #         chipload = load
     return chipload
 
-def find_nearest_low(array, value):
-    idx = 0
-    max_val = 0
-    for i, x in enumerate(array):
-        if x == value:
-            return value
-        elif (value - x) > 0:
-            if x > max_val:
-                max_val = x
-                idx = i
-    return array[idx]
-
-def find_nearest_high(array, value):
-    idx = len(array)-1
-    min_val = max(array)
-    for i, x in enumerate(array):
-        if x == value:
-            return value
-        if (value - x) < 0:
-            if x < min_val:
-                min_val = x
-                idx = i
-    return array[idx]
-
 # def main():
 #     example_plywood()
 #     # example_3()
@@ -369,7 +661,38 @@ def example_3():
 if __name__ == '__main__':
     # example_plywood()
 
-    app = QApplication(sys.argv)
-    window = MainWindow(app)
-    window.show()
-    sys.exit(app.exec_())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default=database.DATABASE_PATH,
+                        help="feed and speed spreadsheet (default: %(default)s)")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="re-read the spreadsheet and regenerate the database cache")
+    parser.add_argument("--no-watch", action="store_true",
+                        help="don't reload the database when it changes")
+    parser.add_argument("--db", metavar="SQLITE",
+                        help="use an SQLite database made by sqlstore.py instead of the spreadsheet")
+    parser.add_argument("--map", metavar="FILE",
+                        help="use a memory-mapped database made by mapstore.py instead of the spreadsheet")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="log more, -vv also logs every pipeline stage's timing")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a cProfile of the session to FILE, and stage timings to stderr")
+    args, qt_args = parser.parse_known_args()
+    instrument.setup_logging(args.verbose)
+    if args.profile or args.verbose > 1:
+        metrics = instrument.enable()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    def session():
+        window = MainWindow(app, rebuild_cache=args.rebuild_cache, db_path=args.db,
+                            map_path=args.map, database_path=args.database, watch=not args.no_watch)
+        window.show()
+        return app.exec_()
+
+    if args.profile:
+        status = instrument.profile(session, args.profile)
+    else:
+        status = session()
+    if instrument.sink is not None:
+        print(metrics.report(), file=sys.stderr)
+    sys.exit(status)
@@ -0,0 +1,59 @@
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from database import file_signature
+
+SETTLE_MS = 500
+
+
+class FileWatcher(QObject):
+    """
+    Emits changed(path) when a file has been modified and then left alone
+    for settle_ms, so a save that writes in several steps is seen once.
+
+    Editors often save by writing a new file and renaming it over the old
+    one, which drops the path from QFileSystemWatcher. The directory is
+    watched too and the file is re-added after every change. Only a change
+    of mtime or size counts, so touching the directory for other files
+    doesn't trigger a reload.
+    """
+    changed = pyqtSignal(str)
+
+    def __init__(self, path, settle_ms=SETTLE_MS, parent=None):
+        QObject.__init__(self, parent)
+        self.path = os.path.abspath(path)
+        self.signature = self.current_signature()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(settle_ms)
+        self.timer.timeout.connect(self.settled)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(os.path.dirname(self.path))
+        self.watch_file()
+        self.watcher.fileChanged.connect(self.touched)
+        self.watcher.directoryChanged.connect(self.touched)
+
+    def current_signature(self):
+        try:
+            return file_signature(self.path)
+        except OSError:
+            return None
+
+    def watch_file(self):
+        if self.path not in self.watcher.files() and os.path.exists(self.path):
+            self.watcher.addPath(self.path)
+
+    def touched(self, _path):
+        self.timer.start()
+
+    def settled(self):
+        self.watch_file()
+        signature = self.current_signature()
+        # a missing file is most likely mid-save, wait for it to come back
+        if signature is None or signature == self.signature:
+            return
+        self.signature = signature
+        self.changed.emit(self.path)
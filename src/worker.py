@@ -0,0 +1,82 @@
+import logging
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+log = logging.getLogger(__name__)
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(int, object) # request id, result
+
+
+class Job(QRunnable):
+    def __init__(self, request_id, fn, args, signals):
+        QRunnable.__init__(self)
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception:
+            log.exception("%s failed", getattr(self.fn, '__name__', 'job'))
+            result = None
+        self.signals.finished.emit(self.request_id, result)
+
+
+class LookupWorker(QObject):
+    """
+    Runs fn off the GUI thread and posts results back through result_ready.
+
+    Only one job runs at a time. Requests that arrive while it runs replace
+    each other, so after a burst of keystrokes only the newest one is
+    computed, and results that are already stale when they finish are
+    dropped.
+    """
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, fn, parent=None):
+        QObject.__init__(self, parent)
+        self.fn = fn
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.latest = 0
+        self.pending = None
+        self.running = False
+
+        # lives on the GUI thread, so finished is delivered there
+        self.signals = WorkerSignals(self)
+        self.signals.finished.connect(self._finished)
+
+    def submit(self, *args):
+        self.latest += 1
+        self.pending = (self.latest, args)
+        if not self.running:
+            self._start()
+
+    def _start(self):
+        request_id, args = self.pending
+        self.pending = None
+        self.running = True
+        self.pool.start(Job(request_id, self.fn, args, self.signals))
+
+    def _finished(self, request_id, result):
+        self.running = False
+        if self.pending is not None:
+            self._start()
+        elif request_id == self.latest:
+            self.result_ready.emit(result)
+
+    def cancel(self):
+        """
+        Drop the queued request and wait for the running one, whose result
+        is dropped too.
+        """
+        self.pending = None
+        self.latest += 1
+        self.pool.waitForDone()
+
+    def wait(self):
+        self.pool.waitForDone()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+# the calculator is a set of top level modules, imported as the scripts do
+sys.path.insert(0, SRC)
+
+DATABASE_PATH = os.path.join(SRC, "data", "feed_speed_database.ods")
+
+
+@pytest.fixture(scope="session")
+def merged_db(tmp_path_factory):
+    """
+    Every sheet of the bundled spreadsheet imported into one SQLite file.
+    """
+    from sqlstore import import_sources
+
+    path = str(tmp_path_factory.mktemp("db") / "feeds.sqlite")
+    import_sources([DATABASE_PATH], path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def table():
+    """
+    The non-metals sheet, as the GUI loads it (read without the cache).
+    """
+    import database
+
+    return database.read_ods(DATABASE_PATH, "non-metals")
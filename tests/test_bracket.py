@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from bracket import bracket, find_nearest_high, find_nearest_low, nearest_pair
+
+XS = [0.125, 0.25, 0.5]
+
+
+def test_between_values():
+    lo, hi, weight, outside = bracket(XS, 0.375)
+    assert (lo, hi, outside) == (1, 2, False)
+    assert weight == pytest.approx(0.5)
+
+
+def test_exact_match_has_no_weight():
+    lo, hi, weight, outside = bracket(XS, 0.25)
+    assert (lo, hi, weight, outside) == (1, 2, 0.0, False)
+    assert bracket(XS, 0.5)[:3] == (1, 2, 1.0)
+
+
+@pytest.mark.parametrize("x, lo, weight", [(0.0, 0, -1.0), (1.0, 1, 3.0)])
+def test_outside_clamps_or_extrapolates(x, lo, weight):
+    clamped = bracket(XS, x, 'clamp')
+    free = bracket(XS, x, 'extrapolate')
+    assert clamped.outside and free.outside
+    assert clamped.lo == free.lo == lo
+    assert clamped.weight == min(max(weight, 0.0), 1.0)
+    assert free.weight == pytest.approx(weight)
+
+
+def test_arrays():
+    b = bracket(XS, np.array([[0.0, 0.2], [0.5, 0.75]]), 'nan')
+    assert b.lo.shape == (2, 2)
+    np.testing.assert_array_equal(b.outside, [[True, False], [False, True]])
+
+
+def test_single_value_brackets_everything():
+    b = bracket([0.25], np.array([0.0, 0.25, 1.0]), 'extrapolate')
+    np.testing.assert_array_equal(b.lo, [0, 0, 0])
+    np.testing.assert_array_equal(b.weight, [0.0, 0.0, 0.0])
+    assert not b.outside.any()
+
+
+def test_empty_array():
+    with pytest.raises(ValueError):
+        bracket([], 0.25)
+
+
+def test_nearest_pair():
+    assert nearest_pair(XS, 0.3) == (0.25, 0.5)
+    assert nearest_pair(XS, 0.25) == (0.25, 0.25)
+    assert nearest_pair(XS, 0.0) == (0.125, 0.125)
+    assert nearest_pair(XS, 2.0) == (0.5, 0.5)
+
+
+def test_find_nearest_on_unsorted_values():
+    values = [0.5, 0.125, 0.25, 0.125]
+    assert find_nearest_low(values, 0.3) == 0.25
+    assert find_nearest_high(values, 0.3) == 0.5
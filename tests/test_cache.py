@@ -0,0 +1,65 @@
+import pandas as pd
+
+from cache import LRUCache
+from lookup import COLUMNS, LookupIndex
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_put_refreshes_an_entry():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('a', 10)
+    cache.put('c', 3)
+    assert cache.get('a') == 10
+    assert cache.get('b', 'missing') == 'missing'
+
+
+def test_counters_and_clear():
+    cache = LRUCache(4)
+    cache.put('a', None)
+    assert cache.get('a', 'missing') is None
+    cache.get('b')
+    assert cache.info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 4}
+    cache.clear()
+    assert cache.info() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 4}
+
+
+def test_size_zero_disables():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def frame(feed):
+    return pd.DataFrame([('wood', 'oak', 'HSS', 'end mill', 0, 0.25, feed, 500.0)], columns=COLUMNS)
+
+
+def test_index_cache_is_invalidated_on_reload():
+    index = LookupIndex(frame(0.01))
+    query = ('wood', 'oak', 'HSS', 'end mill', 0.1, 0.25)
+    assert index.feed_speed(*query) == (0.01, 500.0)
+    assert index.feed_speed(*query) == (0.01, 500.0)
+    assert index.cache.info()['hits'] == 1
+
+    index.build(frame(0.02))
+    assert len(index.cache) == 0
+    assert index.feed_speed(*query) == (0.02, 500.0)
+
+
+def test_index_cache_shares_nearly_equal_queries():
+    index = LookupIndex(frame(0.01))
+    index.feed_speed('wood', 'oak', 'HSS', 'end mill', 0.1, 0.25)
+    index.feed_speed('wood', 'oak', 'HSS', 'end mill', 0.1, 0.2500000001)
+    assert index.cache.info()['hits'] == 1
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+import cli
+from lookup import LookupIndex
+
+
+@pytest.fixture(scope="module")
+def index(table):
+    return LookupIndex(table)
+
+
+def job(**fields):
+    values = {'material': 'wood', 'species': 'MDF', 'tool material': 'HSS', 'diameter': 0.25,
+              'flutes': 2}
+    values.update(fields)
+    return values
+
+
+def test_calc_jobs_defaults_to_end_mill(index):
+    without, blank, explicit = cli.calc_jobs(index, [job(), job(operation=''),
+                                                     job(operation='end mill')])
+    assert without == blank == explicit
+    assert without['rpm'] == 9900 and without['feedrate'] == 277.2
+
+
+def test_calc_jobs_unknown_selection_is_blank(index):
+    result = cli.calc_jobs(index, [job(species='unobtainium'), job(diameter='')])
+    assert result == [dict.fromkeys(cli.RESULT_FIELDS, '')] * 2
+
+
+def test_run_batch_streams_chunks(index):
+    infile = io.StringIO("material,species,tool material,diameter,flutes,WOC\n"
+                         + "wood,MDF,HSS,0.25,2,0.1\n" * 5)
+    outfile = io.StringIO()
+    assert cli.run_batch(index, infile, outfile, chunk_size=2) == 5
+    lines = outfile.getvalue().splitlines()
+    assert lines[0] == "material,species,tool material,diameter,flutes,WOC,feed,speed,rpm,feedrate,Q"
+    assert lines[1:] == ["wood,MDF,HSS,0.25,2,0.1,0.014,650.0,9900,277.2,6.93"] * 5
+
+
+def test_run_batch_reports_bad_rows_and_goes_on(index, capsys):
+    infile = io.StringIO("material,species,tool material,diameter,flutes,WOC\n"
+                         "wood,MDF,HSS,0.25,2,0.1\n"
+                         "wood,MDF,HSS,1/4,2,0.1\n"
+                         "wood,MDF,HSS,0.25,abc,0.1\n"
+                         "wood,MDF,HSS,0.25,2,0.1\n")
+    outfile = io.StringIO()
+    errors = []
+    assert cli.run_batch(index, infile, outfile, chunk_size=2, errors=errors) == 4
+    good = "wood,MDF,HSS,0.25,2,0.1,0.014,650.0,9900,277.2,6.93"
+    assert outfile.getvalue().splitlines()[1:] == [
+        good, "wood,MDF,HSS,1/4,2,0.1,,,,,", "wood,MDF,HSS,0.25,abc,0.1,,,,,", good]
+    assert errors == [(3, "diameter '1/4' is not a number"), (4, "flutes 'abc' is not a number")]
+    assert capsys.readouterr().err.splitlines() == ["line 3: diameter '1/4' is not a number",
+                                                    "line 4: flutes 'abc' is not a number"]
+
+
+def test_calc_jobs_raises_without_an_errors_list(index):
+    with pytest.raises(ValueError, match="DOC 'x' is not a number"):
+        cli.calc_jobs(index, [job(DOC='x')])
+
+
+def test_main_batch_exit_status(tmp_path, capsys):
+    jobs = tmp_path / "jobs.csv"
+    jobs.write_text("material,species,tool material,diameter,flutes\nwood,MDF,HSS,1/4,2\n")
+    out = tmp_path / "out.csv"
+    assert cli.main(["--batch", str(jobs), "-o", str(out)]) == 1
+    assert out.read_text().splitlines()[1] == "wood,MDF,HSS,1/4,2,,,,,"
+    assert "line 2: diameter '1/4'" in capsys.readouterr().err
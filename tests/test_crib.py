@@ -0,0 +1,32 @@
+from crib import ToolCrib
+from tool import Tool
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "crib.json")
+    crib = ToolCrib(path)
+    tool = Tool(0.25, 3, 'carbide', 'quarter')
+    tool.stickout = 1.5
+    crib.add(tool)
+    crib.add(Tool(0.5, 2, None, 'half'))
+    crib.save()
+
+    loaded = ToolCrib(path).load()
+    assert len(loaded) == 2
+    assert [t.to_dict() for t in loaded] == [t.to_dict() for t in crib]
+
+
+def test_missing_file_is_an_empty_crib(tmp_path):
+    assert len(ToolCrib(str(tmp_path / "none.json")).load()) == 0
+
+
+def test_add_replaces_by_name_and_remove(tmp_path):
+    crib = ToolCrib(str(tmp_path / "crib.json"))
+    crib.add(Tool(0.25, 2, 'HSS', 'quarter'))
+    crib.add(Tool(0.25, 2, 'HSS', 'other'))
+    crib.add(Tool(0.25, 4, 'carbide', 'quarter'))
+    assert len(crib) == 2
+    assert crib.find('quarter').nt == 4
+    crib.remove('quarter')
+    assert crib.find('quarter') is None
+    assert [t.name for t in crib] == ['other']
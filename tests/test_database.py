@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import database
+from conftest import DATABASE_PATH
+
+
+def test_cache_paths_depend_on_the_directory(tmp_path):
+    first = database.cache_paths(str(tmp_path / "a" / "feeds.ods"), "non-metals", str(tmp_path))
+    second = database.cache_paths(str(tmp_path / "b" / "feeds.ods"), "non-metals", str(tmp_path))
+    assert first != second
+    assert database.cache_paths(os.path.join(str(tmp_path), "a", ".", "feeds.ods"), "non-metals",
+                                str(tmp_path)) == first
+    assert os.path.basename(first[0]).startswith("feeds-")
+
+
+def test_same_name_spreadsheets_are_cached_apart(tmp_path, table):
+    cache_dir = str(tmp_path / "cache")
+    paths = []
+    for name in ("a", "b"):
+        os.mkdir(str(tmp_path / name))
+        paths.append(str(tmp_path / name / "feed_speed_database.ods"))
+        shutil.copy(DATABASE_PATH, paths[-1])
+    # same content, size and mtime, so only the path tells them apart
+    stat = os.stat(paths[0])
+    os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    for path in paths:
+        database.load_table(path, cache_dir=cache_dir)
+    assert len([f for f in os.listdir(cache_dir) if f.endswith(".pkl")]) == 2
+    assert database.load_table(paths[1], cache_dir=cache_dir).equals(table)
+
+
+def test_cache_leaves_no_temporary_files(tmp_path, table):
+    cache_dir = str(tmp_path / "cache")
+    assert database.load_table(DATABASE_PATH, cache_dir=cache_dir).equals(table)
+    assert sorted(os.path.splitext(f)[1] for f in os.listdir(cache_dir)) == [".json", ".pkl"]
+
+
+def test_unwritable_cache_still_loads(tmp_path, table, monkeypatch, caplog):
+    def fail(*args):
+        raise PermissionError("read-only")
+    monkeypatch.setattr(database, "write_cache", fail)
+    df = database.load_table(DATABASE_PATH, cache_dir=str(tmp_path / "cache"))
+    assert df.equals(table)
+    assert "couldn't cache" in caplog.text
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "data.json")
+    database.write_meta(path, 1, 2, "abc")
+    try:
+        with database.replacing(path, "w") as f:
+            f.write("partial")
+            raise OSError("disk full")
+    except OSError:
+        pass
+    assert os.listdir(str(tmp_path)) == ["data.json"]
+    assert database.read_meta(path) == {"mtime": 1, "size": 2, "sha1": "abc"}
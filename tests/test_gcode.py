@@ -0,0 +1,101 @@
+import io
+
+import pytest
+
+import gcode
+
+SETTINGS = {1: (9900, 277.2), 2: None}
+
+
+def rewrite(program, settings=SETTINGS, block_size=gcode.BLOCK_SIZE, **kwargs):
+    gpass = gcode.GcodePass(settings, **kwargs)
+    blocks = gcode.read_blocks(io.BytesIO(program), block_size)
+    return b''.join(gpass.process(blocks)), gpass
+
+
+def test_rewrites_s_and_cutting_f():
+    out, gpass = rewrite(b"T1 M6\nS12000 M3\nG1 Z-.1 F20\nG1 X1 Y2 F100\nG1 X2 F100.\n")
+    assert out == b"T1 M6\nS9900 M3\nG1 Z-.1 F20\nG1 X1 Y2 F277.2\nG1 X2 F277.2\n"
+    assert gpass.rewritten == 3
+
+
+def test_words_before_a_tool_change_are_left():
+    out, gpass = rewrite(b"S12000 F100\nT1\nG1 X1 F100\nM6\nG1 X1 F100\n")
+    assert out == b"S12000 F100\nT1\nG1 X1 F100\nM6\nG1 X1 F277.2\n"
+
+
+def test_comments_are_skipped():
+    program = b"T1 M6 (S5 F5)\nG1 X1 F100 ; F200\n"
+    out, _ = rewrite(program)
+    assert out == b"T1 M6 (S5 F5)\nG1 X1 F277.2 ; F200\n"
+
+
+def test_unknown_tool_is_left_and_warned():
+    program = b"T2 M6\nS12000\nG1 X1 F100\nT3 M6\nG1 X1 F100\n"
+    out, gpass = rewrite(program)
+    assert out == program
+    assert gpass.unknown == {2, 3}
+    assert gpass.warnings[0].startswith("line 1: no feed and speed for T2")
+
+
+def test_g21_feeds_are_mm_per_min():
+    out, _ = rewrite(b"G21\nT1 M6\nG1 X10 F1000\nG20\nG1 X1 F100\n")
+    assert out == b"G21\nT1 M6\nG1 X10 F7040.9\nG20\nG1 X1 F277.2\n"
+
+
+@pytest.mark.parametrize("inch", [b"G20", b"G 20", b"G020", b"g20", b"G20.0", b"G1 G20"])
+def test_unit_words_in_any_form(inch):
+    out, gpass = rewrite(b"G21\nT1 M6\nG1 X10 F1000\n" + inch + b"\nG1 X1 F100\n")
+    assert out.endswith(b"\nG1 X1 F277.2\n")
+    assert gpass.units == 'in'
+
+
+@pytest.mark.parametrize("metric", [b"g21", b"G 21", b"G021", b"G0 g 21 X0"])
+def test_metric_words_in_any_form(metric):
+    out, gpass = rewrite(b"T1 M6\n" + metric + b"\nG1 X10 F1000\n")
+    assert out.endswith(b"\nG1 X10 F7040.9\n")
+    assert gpass.units == 'mm'
+
+
+def test_unit_words_in_comments_are_ignored():
+    out, gpass = rewrite(b"T1 M6 (G21)\n; G 21\nG1 X1 F100\n")
+    assert out.endswith(b"\nG1 X1 F277.2\n")
+    assert gpass.units == 'in'
+
+
+def test_units_default_for_a_program_without_g20_or_g21():
+    out, _ = rewrite(b"T1 M6\nG1 X10 F1000\n", units='mm')
+    assert out == b"T1 M6\nG1 X10 F7040.9\n"
+
+
+def test_arcs_are_not_unit_changes():
+    out, gpass = rewrite(b"G21\nT1 M6\nG2 X1 Y1 I1 F100\nG1 X1 F100\n")
+    assert out == b"G21\nT1 M6\nG2 X1 Y1 I1 F7040.9\nG1 X1 F7040.9\n"
+    assert gpass.units == 'mm'
+
+
+def test_validate_reports_words_over_the_limits():
+    program = b"G21\nT1 M6\nS9900\nS12000\nG1 X1 F7000\nG1 X1 F8000\n"
+    out, gpass = rewrite(program, validate=True)
+    assert out == program
+    assert gpass.violations == 2
+    assert gpass.warnings == ["line 4: S12000 is over 9900 for T1",
+                              "line 6: F8000 is over 7040.9 mm/min for T1"]
+
+
+def test_validate_tolerance():
+    _, gpass = rewrite(b"T1 M6\nG1 X1 F280\n", validate=True, tolerance=0.02)
+    assert gpass.violations == 0
+
+
+def test_small_blocks_give_the_same_program():
+    program = b"G21\nT1 M6\nS12000 M3\n" + b"G1 X1 Y2 Z-1 F100\nG1 X3\n" * 50
+    assert rewrite(program, block_size=7)[0] == rewrite(program)[0]
+
+
+def test_tool_settings_cap_rpm(table):
+    from lookup import LookupIndex
+
+    tools = {1: gcode.Tool(0.25, 2, 'HSS', 'T1'), 2: gcode.Tool(0.25, 2, 'diamond', 'T2')}
+    settings = gcode.tool_settings(LookupIndex(table), tools, 'wood', 'MDF', max_rpm=6000)
+    assert settings == {1: (6000, 168.0), 2: None}
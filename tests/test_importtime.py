@@ -0,0 +1,21 @@
+import check_importtime
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       900 |        900 | site
+import time:       100 |        100 |   instrument
+import time:       200 |        200 |   power
+import time:       300 |        600 | operation
+import time:        50 |         50 | tool
+"""
+
+
+def test_nested_modules_are_counted_once():
+    times, total = check_importtime.parse(OUTPUT, ["tool", "operation", "power"])
+    assert times == {"site": 900, "instrument": 100, "power": 200, "operation": 600, "tool": 50}
+    # power is part of operation's 600, and site isn't one of the modules
+    assert total == 650
+
+
+def test_core_imports_are_light_and_within_budget(capsys):
+    assert check_importtime.main([]) == 0, capsys.readouterr().out
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from interpolate import Grid
+
+DOCS = [0.1, 0.2]
+DIAMETERS = [np.array([0.25, 0.5]), np.array([0.25, 0.5])]
+FEEDS = [np.array([0.01, 0.02]), np.array([0.02, 0.04])]
+SPEEDS = [np.array([500.0, 600.0]), np.array([700.0, 800.0])]
+
+
+@pytest.fixture
+def grid():
+    return Grid(DOCS, DIAMETERS, FEEDS, SPEEDS)
+
+
+def test_grid_points_are_exact(grid):
+    assert grid.evaluate(0.1, 0.25) == (0.01, 500.0)
+    assert grid.evaluate(0.2, 0.5) == (0.04, 800.0)
+
+
+def test_bilinear(grid):
+    assert grid.evaluate(0.15, 0.375) == pytest.approx((0.0225, 650.0))
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ('clamp', (0.04, 800.0)),
+    ('extrapolate', (0.12, 1200.0)),
+    ('nan', None),
+])
+def test_outside_the_data(grid, mode, expected):
+    result = grid.evaluate(0.3, 1.0, mode)
+    if expected is None:
+        assert np.isnan(result).all()
+    else:
+        assert result == pytest.approx(expected)
+
+
+def test_arrays_broadcast(grid):
+    feeds, speeds = grid.evaluate(np.array([0.1, 0.2]), 0.25)
+    np.testing.assert_allclose(feeds, [0.01, 0.02])
+    np.testing.assert_allclose(speeds, [500.0, 700.0])
+
+
+def test_rows_with_other_diameters_are_resampled():
+    grid = Grid([0.1, 0.2], [np.array([0.25, 0.5]), np.array([0.25, 0.375, 0.5])],
+                [np.array([0.01, 0.02]), np.array([0.02, 0.02, 0.04])],
+                [np.array([500.0, 600.0]), np.array([700.0, 700.0, 800.0])])
+    np.testing.assert_array_equal(grid.diameters, [0.25, 0.375, 0.5])
+    np.testing.assert_allclose(grid.feeds, [[0.01, 0.015, 0.02], [0.02, 0.02, 0.04]])
+
+
+def test_out_of_range_diameter_is_filled_along_doc():
+    # the 0.2 DOC row has no 0.5" cutter, so it takes the 0.1 DOC value there
+    grid = Grid([0.1, 0.2], [np.array([0.25, 0.5]), np.array([0.25])],
+                [np.array([0.01, 0.02]), np.array([0.008])],
+                [np.array([500.0, 700.0]), np.array([400.0])])
+    np.testing.assert_allclose(grid.feeds, [[0.01, 0.02], [0.008, 0.02]])
+    np.testing.assert_allclose(grid.speeds, [[500.0, 700.0], [400.0, 700.0]])
+
+
+def test_from_arrays_uses_the_arrays(grid):
+    copy = Grid.from_arrays(grid.docs, grid.diameters, grid.feeds, grid.speeds)
+    assert copy.feeds is grid.feeds
+    assert copy.evaluate(0.15, 0.375) == grid.evaluate(0.15, 0.375)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lookup import COLUMNS, LookupIndex, Leaf
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def test_any_doc_rows_apply_at_every_doc():
+    leaf = Leaf([(None, 0.25, 0.01, 600.0), (None, 0.5, 0.02, 600.0)])
+    assert leaf.any_doc
+    for doc in (0.0, 0.1, 1.0):
+        assert leaf.grid.evaluate(doc, 0.375) == pytest.approx((0.015, 600.0))
+
+
+def test_any_doc_rows_are_only_a_fallback():
+    real = [(0.125, 0.125, 0.0062, 588.75), (0.25, 0.25, 0.0062, 1177.5)]
+    with_any = Leaf([(None, 0.5, 0.0131, 1500.0)] + real)
+    without = Leaf(real)
+    assert not with_any.any_doc
+    for doc in (0.0, 0.03, 0.0625, 0.125, 0.2):
+        assert with_any.grid.evaluate(doc, 0.125) == without.grid.evaluate(doc, 0.125)
+
+
+def test_doc_zero_in_the_sheet_means_any_doc():
+    index = LookupIndex(frame([
+        ('wood', 'MDF', 'carbide', 'end mill', 0, 0.5, 0.0131, 1500.0),
+        ('wood', 'MDF', 'carbide', 'end mill', 0.125, 0.125, 0.0062, 588.75),
+    ]))
+    assert index.feed_speed('wood', 'MDF', 'carbide', 'end mill', 0.03, 0.125) == (0.0062, 588.75)
+    assert index.rows('wood', 'MDF', 'carbide', 'end mill', 0.03, 0.125) == \
+        [(0.125, 0.125, 0.0062, 588.75)]
+
+
+def test_single_diameter_row_is_not_held_flat():
+    # DOC 0.2 only has data for a 0.25" cutter; at 0.5" the 0.1 DOC row is the only data
+    leaf = Leaf([(0.1, 0.25, 0.010, 500.0), (0.1, 0.5, 0.020, 700.0), (0.2, 0.25, 0.008, 400.0)])
+    assert leaf.grid.evaluate(0.2, 0.5) == pytest.approx((0.020, 700.0))
+    assert leaf.grid.evaluate(0.2, 0.25) == pytest.approx((0.008, 400.0))
+    # halfway in DOC at 0.25", and the diameter interpolated at 0.1 DOC
+    assert leaf.grid.evaluate(0.15, 0.25) == pytest.approx((0.009, 450.0))
+    assert leaf.grid.evaluate(0.1, 0.375) == pytest.approx((0.015, 600.0))
+
+
+def test_one_diameter_per_doc_interpolates_between_cutters():
+    leaf = Leaf([(0.25, 0.25, 0.0062, 1177.5), (0.375, 0.375, 0.0122, 1766.25)])
+    for doc in (0.1, 0.25, 0.3, 0.5):
+        assert leaf.grid.evaluate(doc, 0.3) == pytest.approx((0.0086, 1413.0))
+
+
+def test_batch_matches_scalar():
+    leaf_rows = [(0.1, 0.25, 0.010, 500.0), (0.1, 0.5, 0.020, 700.0), (0.2, 0.25, 0.008, 400.0)]
+    index = LookupIndex(frame([('wood', 'oak', 'HSS', 'end mill') + r for r in leaf_rows]),
+                        cache_size=0)
+    docs = np.array([0.05, 0.15, 0.2, 0.3])
+    diameters = np.array([0.3, 0.25, 0.5, 0.1])
+    feeds, speeds = index.feed_speed_batch('wood', 'oak', 'HSS', 'end mill', docs, diameters)
+    for i in range(len(docs)):
+        assert (feeds[i], speeds[i]) == index.feed_speed('wood', 'oak', 'HSS', 'end mill',
+                                                         docs[i], diameters[i])
+
+
+def test_empty_match():
+    index = LookupIndex(frame([('wood', 'oak', 'HSS', 'end mill', 0, 0.25, 0.01, 500.0)]))
+    assert index.feed_speed('wood', 'pine', 'HSS', 'end mill', 0.1, 0.25) is None
+    assert index.feed_speed('metal', 'oak', 'HSS', 'end mill', 0.1, 0.25) is None
+    assert index.rows('wood', 'pine', 'HSS', 'end mill', 0.1, 0.25) == []
+    feeds, speeds = index.feed_speed_batch('wood', 'pine', 'HSS', 'end mill', [0.1], [0.25])
+    assert np.isnan(feeds).all() and np.isnan(speeds).all()
+
+
+def test_out_of_range_diameter_follows_mode():
+    rows = [('wood', 'oak', 'HSS', 'end mill', 0, 0.25, 0.01, 500.0),
+            ('wood', 'oak', 'HSS', 'end mill', 0, 0.5, 0.02, 500.0)]
+    assert LookupIndex(frame(rows), mode='clamp').feed_speed(
+        'wood', 'oak', 'HSS', 'end mill', 0.1, 1.0) == (0.02, 500.0)
+    assert LookupIndex(frame(rows), mode='extrapolate').feed_speed(
+        'wood', 'oak', 'HSS', 'end mill', 0.1, 0.75) == (0.03, 500.0)
+    assert LookupIndex(frame(rows), mode='nan').feed_speed(
+        'wood', 'oak', 'HSS', 'end mill', 0.1, 1.0) is None
+
+
+def test_nan_species_and_blank_feeds():
+    index = LookupIndex(frame([
+        ('wood', np.nan, 'HSS', 'end mill', 0, 0.25, 0.01, 500.0),
+        ('wood', 'oak', 'HSS', 'end mill', 0, 0.25, np.nan, 500.0),
+    ]))
+    # a row without a feed is dropped, so oak has no data
+    species = index.species('wood')
+    assert len(species) == 1 and np.isnan(species[0])
+    assert index.leaf('wood', 'oak', 'HSS', 'end mill') is None
+    # the blank species is still reachable through what species() returns
+    assert index.feed_speed('wood', species[0], 'HSS', 'end mill', 0.1, 0.25) == (0.01, 500.0)
+
+
+def test_rebuild_reuses_unchanged_leaves():
+    rows = [('wood', 'oak', 'HSS', 'end mill', 0, 0.25, 0.01, 500.0),
+            ('wood', 'MDF', 'HSS', 'end mill', 0, 0.25, 0.01, 650.0)]
+    first = LookupIndex(frame(rows))
+    first.feed_speed('wood', 'oak', 'HSS', 'end mill', 0.1, 0.25)
+    rows[1] = ('wood', 'MDF', 'HSS', 'end mill', 0, 0.25, 0.02, 650.0)
+    second = LookupIndex(frame(rows), previous=first)
+    assert second.rebuilt == 1
+    assert second.leaf('wood', 'oak', 'HSS', 'end mill') is first.leaf('wood', 'oak', 'HSS', 'end mill')
+    assert second.feed_speed('wood', 'MDF', 'HSS', 'end mill', 0.1, 0.25) == (0.02, 650.0)
+
+
+def test_bundled_sheet(table):
+    index = LookupIndex(table)
+    assert 'wood' in index.families()
+    assert index.feed_speed('wood', 'MDF', 'HSS', 'end mill', 0.1, 0.3) == (0.0164, 650.0)
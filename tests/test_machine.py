@@ -0,0 +1,30 @@
+from machine import Machine, Spindle, load_machines, save_machines
+
+
+def test_spindle_dict_round_trip():
+    spindle = Spindle()
+    spindle.max_rpm, spindle.HP, spindle.E = 24000, 2.2, 0.8
+    copy = Spindle.from_dict(spindle.to_dict())
+    assert (copy.max_rpm, copy.HP, copy.E) == (24000, 2.2, 0.8)
+
+
+def test_spindle_defaults_for_missing_keys():
+    spindle = Spindle.from_dict({"max_rpm": 18000})
+    assert (spindle.max_rpm, spindle.HP, spindle.E) == (18000, 0, 1.0)
+
+
+def test_save_and_load_machines(tmp_path):
+    path = str(tmp_path / "machines.json")
+    spindle = Spindle()
+    spindle.max_rpm, spindle.HP = 24000, 3
+    save_machines([Machine("router", spindle), Machine("mill")], path)
+
+    machines = load_machines(path)
+    assert [m.to_dict() for m in machines] == [
+        {"name": "router", "spindle": {"max_rpm": 24000, "HP": 3, "E": 1.0}},
+        {"name": "mill", "spindle": {"max_rpm": 0, "HP": 0, "E": 1.0}},
+    ]
+
+
+def test_no_saved_machines(tmp_path):
+    assert load_machines(str(tmp_path / "none.json")) == []
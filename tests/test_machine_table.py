@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lookup import COLUMNS, LookupIndex
+from machine import Spindle
+from machine_table import MachineTable
+from tool import Tool
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LookupIndex(pd.DataFrame([
+        ('steel', '', 'carbide', 'end mill', 0.25, 0.25, 0.002, 300.0),
+        ('steel', '', 'carbide', 'end mill', 0.25, 0.5, 0.003, 300.0),
+    ], columns=COLUMNS))
+
+
+def spindle(max_rpm=0, HP=0):
+    s = Spindle()
+    s.max_rpm, s.HP = max_rpm, HP
+    return s
+
+
+def test_power_uses_the_hardness(index):
+    tools = [Tool(0.5, 2, 'carbide', 'half')]
+    soft = MachineTable(index, spindle(), tools, hardness=90)
+    hard = MachineTable(index, spindle(), tools, hardness=250)
+    assert soft.hardness == 90
+    # Kp 0.63 and 0.92 for steel at those hardnesses
+    assert hard.columns['Pm'][0] / soft.columns['Pm'][0] == pytest.approx(0.92 / 0.63)
+    np.testing.assert_array_equal(hard.columns['Q'], soft.columns['Q'])
+
+
+def test_tools_with_the_same_geometry_get_their_own_rows(index):
+    tools = [Tool(0.5, 2, 'carbide', 'roughing'), Tool(0.25, 2, 'carbide', 'quarter'),
+             Tool(0.5, 2, 'carbide', 'finishing'), Tool(0.5, 2, 'HSS', 'hss')]
+    table = MachineTable(index, spindle(), tools)
+    assert len(table) == 3
+    assert list(table.columns['name']) == ['roughing', 'quarter', 'finishing']
+    selection = ('steel', '', 'carbide', 'end mill')
+    assert table.get(*selection, 0)['name'] == 'roughing'
+    assert table.get(*selection, 2)['name'] == 'finishing'
+    assert table.get(*selection, 3) is None
+    assert table.get(*selection, 0)['fm'] == table.get(*selection, 2)['fm']
+
+
+def test_rpm_is_capped_at_the_spindle_max(index):
+    tools = [Tool(0.25, 2, 'carbide', 'quarter')]
+    free = MachineTable(index, spindle(), tools).row(0)
+    capped = MachineTable(index, spindle(max_rpm=3000), tools).row(0)
+    assert free['N'] > 3000
+    assert capped['N'] == 3000
+    assert capped['f'] == free['f']
+    assert capped['fm'] == pytest.approx(round(capped['f'] * 2 * 3000, 1))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from material import Material
+from operation import Operation, calc_batch, round_feed
+from tool import Tool
+
+
+def scalar(D, nt, ss, f, w, doc, max_rpm=None):
+    op = Operation(Tool(D, nt), Material('wood'), width=w, doc=doc)
+    op.ss, op.f, op.w, op.doc = ss, f, w, doc
+    op.calc_feedrate(max_rpm)
+    op.calc_power()
+    return op.N, op.fm, op.Q
+
+
+def test_round_feed_matches_round_on_ties():
+    values = [17.05, 0.15, 2.675, 1e6 + 0.05, -17.05, 17.0, np.nan]
+    expected = [round(v, 1) for v in values]
+    np.testing.assert_array_equal(round_feed(values), expected)
+    assert round_feed(17.05) == 17.1 and np.ndim(round_feed(17.05)) == 0
+
+
+def test_calc_batch_reported_case():
+    N, fm, _ = calc_batch(1.0412486, 1, 297.2866, 0.0155)
+    assert (N, fm) == (1100, 17.1)
+
+
+@pytest.mark.parametrize("max_rpm", [None, 12000, 18000.5])
+def test_calc_batch_matches_scalar(max_rpm):
+    rng = np.random.default_rng(3)
+    n = 2000
+    D = rng.uniform(0.03, 1.5, n)
+    nt = rng.integers(1, 5, n)
+    ss = rng.uniform(50, 2000, n)
+    # round chiploads, like the database's, land on ties often
+    f = np.round(rng.uniform(0.001, 0.03, n), 4)
+    w = rng.uniform(0.01, 1.0, n)
+    doc = rng.uniform(0.01, 1.0, n)
+
+    N, fm, Q = calc_batch(D, nt, ss, f, w, doc, max_rpm=max_rpm)
+    for i in range(n):
+        expected = scalar(float(D[i]), int(nt[i]), float(ss[i]), float(f[i]), float(w[i]),
+                          float(doc[i]), max_rpm)
+        assert (N[i], fm[i], Q[i]) == expected, i
+
+
+def test_calc_batch_without_width_or_doc():
+    N, fm, Q = calc_batch([0.25, 0.5], 2, 650.0, 0.014)
+    np.testing.assert_array_equal(N, [9900, 5000])
+    np.testing.assert_array_equal(fm, [277.2, 140.0])
+    assert np.isnan(Q).all()
@@ -0,0 +1,72 @@
+import math
+
+import pandas as pd
+import pytest
+
+from lookup import COLUMNS, LookupIndex
+from machine import Spindle
+from material import Material
+from operation import Operation
+from optimizer import optimize
+from tool import Tool
+
+
+@pytest.fixture(scope="module")
+def index():
+    # speeds for 0.5" at 9200 and 6100 RPM before rounding
+    return LookupIndex(pd.DataFrame([
+        ('steel', '', 'carbide', 'end mill', 0.1, 0.5, 0.002, 1200.0),
+        ('steel', '', 'carbide', 'end mill', 0.5, 0.5, 0.0015, 800.0),
+    ], columns=COLUMNS))
+
+
+def run(index, max_rpm=20000, HP=0, species='', **kwargs):
+    tool = Tool(0.5, 4, 'carbide')
+    material = Material('steel')
+    material.species = species
+    material.hardness = 150
+    operation = Operation(tool, material)
+    operation.operation = 'end mill'
+    spindle = Spindle()
+    spindle.max_rpm = max_rpm
+    spindle.HP = HP
+    return optimize(index, tool, material, operation, spindle, **kwargs)
+
+
+def test_reported_q_matches_reported_feedrate(index):
+    best = run(index)
+    assert best.Q == best.fm * best.w * best.doc
+    assert best.fm == round(best.f * 4 * best.N, 1)
+
+
+def test_max_rpm_clamps_the_speed(index):
+    free = run(index)
+    assert free.N <= 9200
+    clamped = run(index, max_rpm=3000)
+    assert clamped.N == 3000
+    assert (clamped.doc, clamped.w) == (0.5, 0.5)
+    assert clamped.Q < free.Q
+
+
+def test_hp_limits_power(index):
+    free = run(index)
+    limited = run(index, HP=free.Pm / 2)
+    assert limited.Pm <= free.Pm / 2
+    assert limited.Q < free.Q
+    assert limited.percent_power == pytest.approx(100 * limited.Pm / (free.Pm / 2))
+    # Kp for steel at 150 HB, from power_constants.yaml
+    assert limited.Kp == 0.74
+
+
+def test_no_feasible_candidate(index):
+    # nothing can be cut within a thousandth of a horsepower
+    assert run(index, HP=0.001) is None
+    # no feed and speed for this species
+    assert run(index, species='unobtainium') is None
+    assert run(index, rpms=[[50000.0]]) is None
+
+
+def test_needs_diameter_and_max_rpm(index):
+    with pytest.raises(ValueError):
+        run(index, max_rpm=0)
+    assert math.isnan(run(index).percent_power)
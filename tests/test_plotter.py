@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lookup import COLUMNS, LookupIndex
+from machine import Spindle
+from postprocess import plotter
+from tool import Tool
+
+TOOLS = [Tool(0.25, 2, 'carbide', 'quarter'), Tool(0.5, 4, 'carbide', 'half'),
+         Tool(0.5, 2, 'HSS', 'hss')]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LookupIndex(pd.DataFrame([
+        ('steel', '', 'carbide', 'end mill', 0.25, 0.25, 0.002, 300.0),
+        ('steel', '', 'carbide', 'end mill', 0.25, 0.5, 0.003, 300.0),
+        ('wood', 'MDF', 'carbide', 'end mill', 0.25, 0.25, 0.005, 1000.0),
+    ], columns=COLUMNS))
+
+
+def curves(index, family='steel', points=20):
+    spindle = Spindle()
+    spindle.max_rpm = 10000
+    return plotter.material_curves(index, family, tools=TOOLS, spindle=spindle, hardness=150,
+                                   points=points)
+
+
+def test_material_curves(index):
+    charts = curves(index)
+    assert list(charts) == [name for name, _, _, _ in plotter.CHARTS]
+
+    feed = charts['feed_vs_rpm']
+    assert feed.labels == ['quarter carbide end mill', 'half carbide end mill']
+    assert feed.x.shape == feed.y.shape == (2, 20)
+    assert feed.x[0, -1] == 10000
+    # 300 sfm on a 1/2" tool is 2292 RPM, where the curve stops
+    rpms = feed.x[1][np.isfinite(feed.y[1])]
+    assert rpms.max() < 2292 < feed.x[1][len(rpms)]
+    np.testing.assert_allclose(feed.y[1][:len(rpms)], 0.003 * 4 * rpms)
+
+    assert charts['chipload_vs_diameter'].labels == ['carbide end mill']
+    assert np.isfinite(charts['power_vs_doc'].y).all()
+
+
+def test_power_is_nan_without_a_power_constant(index):
+    assert np.isnan(curves(index, 'wood')['power_vs_doc'].y).all()
+
+
+def test_chart_update_moves_the_lines(index):
+    from matplotlib.figure import Figure
+
+    chart = plotter.Chart(Figure().add_subplot(1, 1, 1))
+    charts = curves(index)
+    chart.update(charts['feed_vs_rpm'], point=(1000, 12.0))
+    lines = list(chart.lines)
+    assert chart.ax.get_title() == "Feedrate vs RPM"
+    assert chart.ax.get_legend() is not None
+
+    chart.update(curves(index, points=10)['feed_vs_rpm'])
+    assert chart.lines == lines
+    assert len(lines[0].get_xdata()) == 10
+    assert not chart.marker.get_visible()
+
+    chart.update(charts['chipload_vs_diameter'])
+    assert chart.lines == lines[:1]
+    assert not chart.note.get_visible()
+
+    chart.update(curves(index, 'wood')['power_vs_doc'])
+    assert chart.note.get_visible()
+
+
+@pytest.mark.parametrize("suffix, magic", [(".png", b"\x89PNG"), (".svg", b"<?xml")])
+def test_save(index, tmp_path, suffix, magic):
+    path = str(tmp_path / ("steel" + suffix))
+    assert plotter.save(curves(index), path) == path
+    with open(path, "rb") as f:
+        assert f.read(len(magic)) == magic
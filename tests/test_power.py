@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pytest
+
+from machine import Spindle
+from material import Material
+from operation import Operation, calc_power_batch
+from power import PowerTable, get_power_table
+from tool import Tool
+
+CONSTANTS = {"Material": {
+    "steel": {"Brinell Hardness": {150: {"Kp": 0.74}, 90: {"Kp": 0.63}, 250: {"Kp": 0.92}}},
+    "aluminum": {"Brinell Hardness": {30: {"Kp": 0.25}}},
+}}
+
+
+@pytest.fixture
+def table():
+    return PowerTable(CONSTANTS)
+
+
+def test_kp_interpolates_between_hardness_points(table):
+    assert table.kp("steel", 120) == pytest.approx(0.685)
+    assert table.kp("steel", 200) == pytest.approx(0.83)
+    assert table.kp("steel", 150) == 0.74
+    np.testing.assert_allclose(table.kp("steel", np.array([90, 120, 250])), [0.63, 0.685, 0.92])
+
+
+def test_kp_clamps_outside_the_table(table):
+    assert table.kp("steel", 0) == 0.63
+    assert table.kp("steel", 400) == 0.92
+    assert table.kp("aluminum", 300) == 0.25
+
+
+def test_unknown_material_is_nan(table):
+    assert table.find("MDF", "wood") is None
+    assert math.isnan(table.kp(None, 150))
+    assert np.isnan(table.kp("wood", np.array([100, 200]))).all()
+
+
+def test_find_prefers_species(table):
+    assert table.find("aluminum", "steel") == "aluminum"
+    assert table.find("4140", "steel") == "steel"
+
+
+def test_bundled_table():
+    table = get_power_table()
+    assert table.kp("steel", 150) == 0.74
+    assert get_power_table() is table
+
+
+def test_power_batch_against_hand_computed_values():
+    # 20 in/min x 0.5 in wide x 0.1 in deep = 1 in^3/min, 0.74 hp/in^3/min at 80% efficiency
+    Q, Pm, percent = calc_power_batch(20.0, 0.5, 0.1, 0.74, E=0.8, HP=2.0)
+    assert Q == pytest.approx(1.0)
+    assert Pm == pytest.approx(0.925)
+    assert percent == pytest.approx(46.25)
+
+
+def test_power_batch_without_spindle_hp():
+    Q, Pm, percent = calc_power_batch([20.0, 40.0], 0.5, 0.1, 0.74, HP=0.0)
+    np.testing.assert_allclose(Pm, [0.74, 1.48])
+    assert np.isnan(percent).all()
+    assert np.isnan(calc_power_batch(20.0, 0.5, 0.1, 0.74)[2])
+
+
+def test_operation_power_uses_hardness():
+    material = Material("steel")
+    material.hardness = 150
+    op = Operation(Tool(0.5, 2), material)
+    op.fm, op.w, op.doc = 20.0, 0.5, 0.1
+    spindle = Spindle()
+    spindle.HP, spindle.E = 2.0, 0.8
+    op.calc_power(spindle)
+    assert (op.Kp, op.Q) == (0.74, pytest.approx(1.0))
+    assert op.percent_power == pytest.approx(46.25)
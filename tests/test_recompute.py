@@ -0,0 +1,64 @@
+from recompute import RecomputeGraph
+
+
+def graph(calls, async_stages=()):
+    g = RecomputeGraph()
+
+    def stage(name):
+        def fn():
+            calls.append(name)
+            return False if name in async_stages else None
+        return fn
+
+    # diameter -> rpm -> feedrate -> power, flutes -> feedrate, woc -> power
+    g.add_stage('rpm', stage('rpm'), ['diameter'])
+    g.add_stage('feedrate', stage('feedrate'), ['rpm', 'flutes'])
+    g.add_stage('power', stage('power'), ['feedrate', 'woc'])
+    g.add_stage('chart', stage('chart'), ['diameter'])
+    return g
+
+
+def test_runs_only_downstream_stages():
+    calls = []
+    g = graph(calls)
+    g.mark('flutes')
+    g.run()
+    assert calls == ['feedrate', 'power']
+    assert not g.dirty
+
+
+def test_runs_in_order_added():
+    calls = []
+    g = graph(calls)
+    g.mark('diameter')
+    g.run()
+    assert calls == ['rpm', 'feedrate', 'power', 'chart']
+
+
+def test_mark_all():
+    calls = []
+    g = graph(calls)
+    g.mark_all()
+    g.run()
+    assert calls == ['rpm', 'feedrate', 'power', 'chart']
+
+
+def test_unknown_input_marks_nothing():
+    calls = []
+    g = graph(calls)
+    g.mark('hardness')
+    g.run()
+    assert calls == []
+
+
+def test_async_stage_holds_its_dependents():
+    calls = []
+    g = graph(calls, async_stages={'rpm'})
+    g.mark('diameter')
+    g.run()
+    assert calls == ['rpm', 'chart']
+    assert g.dirty == {'feedrate', 'power'}
+
+    g.resolve('rpm')
+    assert calls == ['rpm', 'chart', 'feedrate', 'power']
+    assert not g.dirty and not g.pending
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from material import Material
+from operation import Operation
+from records import NONE, MaterialRecords, OperationRecords, StringTable, ToolRecords
+from tool import Tool
+
+
+def make_operation(D=0.25, species='MDF'):
+    tool = Tool(D, 2, 'carbide', 'quarter')
+    tool.stickout = 1.0
+    material = Material('wood')
+    material.species = species
+    op = Operation(tool, material, doc=0.1)
+    op.operation = 'end mill'
+    op.f, op.ss = 0.01, 1000.0
+    op.calc_feedrate()
+    return op
+
+
+def test_string_table():
+    strings = StringTable()
+    assert strings.code('a') == 0 and strings.code('b') == 1 and strings.code('a') == 0
+    assert strings.code(None) == NONE
+    codes = strings.encode(['b', None, 'c', 'b'])
+    np.testing.assert_array_equal(codes, [1, NONE, 2, 1])
+    assert list(strings.decode(codes)) == ['b', None, 'c', 'b']
+
+
+def test_tool_round_trip():
+    records = ToolRecords()
+    for D in (0.125, 0.25, None):
+        records.append(Tool(D, 3, None if D is None else 'HSS', 'T'))
+    tool = records.tool(1)
+    assert (tool.D, tool.nt, tool.material, tool.name) == (0.25, 3, 'HSS', 'T')
+    missing = records.tool(2)
+    assert missing.D is None and missing.material is None
+    assert list(records.text('tool_material')) == ['HSS', 'HSS', None]
+
+
+def test_material_round_trip():
+    records = MaterialRecords()
+    material = Material('wood')
+    material.species = 'oak'
+    material.hardness = 1200.0
+    records.append(material)
+    copy = records.material(0)
+    assert vars(copy) == vars(material)
+
+
+def test_operation_round_trip():
+    op = make_operation()
+    records = OperationRecords.from_operations([op, make_operation(0.5, None)])
+    copy = records.operation(0)
+    for name in ('operation', 'doc', 'w', 'f', 'ss', 'N', 'fm', 'Q', 'Kp', 'E'):
+        assert getattr(copy, name) == getattr(op, name)
+    assert vars(copy.tool) == vars(op.tool) | {'rpm': 0, 'chipload': 0}
+    assert copy.material.family == 'wood' and copy.material.species == 'MDF'
+    assert records.operation(1).material.species is None
+    # percent_power is only set by calc_power
+    assert not hasattr(copy, 'percent_power')
+    assert records.nbytes == 2 * records.dtype.itemsize
+
+
+def test_extend_fills_missing_fields():
+    records = ToolRecords()
+    records.append(Tool(0.25, 2, 'HSS', 'a'))
+    records.extend(3, D=np.array([0.1, 0.2, 0.3]), tool_material='carbide')
+    assert len(records) == 4
+    np.testing.assert_allclose(records['D'], [0.25, 0.1, 0.2, 0.3])
+    assert list(records.text('tool_name')) == ['a', None, None, None]
+    assert records['nt'][1] == 0 and math.isnan(records['stickout'][1])
+
+
+def test_row_out_of_range():
+    with pytest.raises(IndexError):
+        ToolRecords().row_values(0)
@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+import schema
+from schema import Normalizer, map_headers, normalize_value, split_header
+from sqlstore import SQLStore, import_sources
+
+
+def test_split_header():
+    assert split_header("Cutter Diameter (mm)") == ("cutter diameter", "mm")
+    assert split_header("  Surface  Speed [m/min] ") == ("surface speed", "m/min")
+    assert split_header("DOC") == ("doc", None)
+
+
+def test_map_headers_prefers_chipload_over_feedrate():
+    mapping = map_headers(["Material", "Feed", "Chipload per tooth", "Tool Diameter (mm)"])
+    assert mapping['feed'] == ("Chipload per tooth", 1.0)
+    assert mapping['diameter'] == ("Tool Diameter (mm)", 1 / 25.4)
+    assert mapping['family'] == ("Material", 1.0)
+
+
+def test_map_headers_rejects_unknown_units():
+    with pytest.raises(ValueError):
+        map_headers(["Diameter (furlong)"])
+
+
+def test_normalize_value():
+    assert normalize_value('family', '  Wood ') == 'wood'
+    assert normalize_value('operation', 'Endmill') == 'end mill'
+    assert normalize_value('tool_material', 'hss') == 'HSS'
+    assert normalize_value('species', 'Red  Oak') == 'Red Oak'
+
+
+def rows(df, source="test"):
+    return [dict(zip(schema.COLUMNS, row)) for row in Normalizer(source).rows(df)]
+
+
+def test_normalizer_rows():
+    df = pd.DataFrame({
+        'Material Family': ['Wood', None, None, 'Plastic'],
+        'Material Species': ['MDF', None, 'oak', None],
+        'Operation': ['endmill', 'end mill', 'end mill', 'end mill'],
+        'Tool Material': ['HSS', 'carbide', 'HSS', 'HSS'],
+        'DOC (mm)': [0, None, 3.175, 1],
+        'Cutter Diameter (mm)': [6.35, 6.35, 12.7, None],
+        'Chipload (mm/tooth)': [0.254, 0.3, 0.4, None],
+        'Speed (m/min)': [198.12, 300, 400, 100],
+    })
+    out = rows(df)
+    # the last row has no feed and is dropped
+    assert len(out) == 3
+    first, second, third = out
+    assert first['family'] == 'wood' and first['operation'] == 'end mill'
+    # DOC 0 and blank DOC are tagged as any DOC, not as a depth of 0
+    assert first['doc'] is None and second['doc'] is None
+    assert third['doc'] == 0.125
+    assert first['diameter'] == 0.25 and first['feed'] == 0.01
+    assert first['speed'] == pytest.approx(650.0)
+    # blank family continues the row above, species too when it's blank
+    assert second['family'] == 'wood' and second['species'] == 'MDF'
+    assert third['family'] == 'wood' and third['species'] == 'oak'
+
+
+def test_normalizer_blank_species_and_missing_family():
+    df = pd.DataFrame({'Family': [None, 'wood'], 'Species': [None, None], 'Operation': ['end mill'] * 2,
+                       'Tool Material': ['HSS'] * 2, 'Feed': [0.01, 0.02], 'Speed': [500, 600]})
+    out = rows(df)
+    # no family to continue from, so the first row is dropped
+    assert len(out) == 1
+    assert out[0]['family'] == 'wood' and out[0]['species'] == ''
+
+
+def test_non_feed_table_is_skipped():
+    assert rows(pd.DataFrame({'Name': ['x'], 'Notes': ['y']})) == []
+
+
+def test_any_doc_rows_are_deduplicated(tmp_path):
+    path = tmp_path / "vendor.csv"
+    path.write_text("family,species,operation,tool material,doc,diameter,feed,speed\n"
+                    "wood,MDF,end mill,HSS,0,0.25,0.01,600\n"
+                    "wood,MDF,end mill,HSS,,0.25,0.02,700\n")
+    count, kept = import_sources([str(path)], str(tmp_path / "feeds.sqlite"))
+    assert (count, kept) == (2, 1)
+    store = SQLStore(str(tmp_path / "feeds.sqlite"))
+    assert store.leaf('wood', 'MDF', 'HSS', 'end mill').source == [(None, 0.25, 0.01, 600.0)]
+    store.close()
+
+
+def test_merged_wood_mdf_lookup(merged_db):
+    """
+    Every sheet merged: non-metals has one any-DOC carbide row for MDF at
+    0.5" (0.0131 ipt, 1500 sfm), Amana has one row per cutter with DOC equal
+    to the diameter. The any-DOC row must not mix with the vendor rows.
+    """
+    store = SQLStore(merged_db, cache_size=0)
+    carbide = ('wood', 'MDF', 'carbide', 'end mill')
+    assert store.leaf(*carbide).source[0] == (None, 0.5, 0.0131, 1500.0)
+    # a 1/8" cutter only has Amana's 1/8" row, at any DOC
+    for doc in (0.0, 0.03, 0.0625, 0.125, 0.5):
+        assert store.feed_speed(*carbide, doc, 0.125) == (0.0062, 588.75)
+    # between the 1/4" (0.0062, 1177.5) and 3/8" (0.0122, 1766.25) rows, 0.4 of the way
+    assert store.feed_speed(*carbide, 0.25, 0.3) == (round(0.0062 + 0.4 * 0.006, 4),
+                                                    round(1177.5 + 0.4 * 588.75, 4))
+    # HSS only has non-metals' any-DOC rows: 0.25" 0.014 and 0.375" 0.02, both 650 sfm
+    assert store.feed_speed('wood', 'MDF', 'HSS', 'end mill', 0.2, 0.3) == (0.0164, 650.0)
+    store.close()
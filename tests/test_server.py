@@ -0,0 +1,81 @@
+import asyncio
+import json
+import logging
+import os
+import re
+
+import pytest
+
+from lookup import LookupIndex
+from server import FeedSpeedServer
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "README.md")
+
+
+@pytest.fixture(scope="module")
+def index(table):
+    return LookupIndex(table)
+
+
+def request(index, method, target, body=b""):
+    """
+    Send one request to a FeedSpeedServer on a free port, return (status, headers, JSON).
+    """
+    async def run():
+        server = await FeedSpeedServer(index).start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write("{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n"
+                         "Connection: close\r\n\r\n".format(method, target, len(body)).encode() + body)
+            data = await reader.read()
+            writer.close()
+        return data
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(body)
+
+
+def readme_payload():
+    with open(README) as f:
+        match = re.search(r"curl -d '(.*?)' \S+/calculate", f.read())
+    return match.group(1).encode("utf-8")
+
+
+def test_calculate_readme_example(index):
+    status, headers, payload = request(index, "POST", "/calculate", readme_payload())
+    assert status == 200
+    assert "X-Response-Time" in headers
+    assert payload == {"results": [{"feed": 0.014, "speed": 650.0, "rpm": 9900, "feedrate": 277.2,
+                                    "Q": ""}]}
+
+
+def test_lookup(index):
+    status, _, payload = request(index, "GET", "/lookup?family=wood&species=MDF&tool_material=HSS"
+                                               "&diameter=.25")
+    assert status == 200
+    assert payload["feed"] == 0.014 and payload["speed"] == 650.0
+
+
+def test_errors(index):
+    assert request(index, "GET", "/nowhere")[0] == 404
+    assert request(index, "GET", "/calculate")[0] == 405
+    assert request(index, "GET", "/lookup?family=wood")[0] == 400
+    assert request(index, "POST", "/calculate", b"{not json")[0] == 400
+    status, _, payload = request(index, "POST", "/calculate", b'{"jobs": [{"diameter": [1]}]}')
+    assert (status, payload) == (400, {"error": "diameter [1] is not a number"})
+
+
+def test_requests_are_logged_and_timed(index, caplog):
+    import instrument
+
+    metrics = instrument.enable()
+    try:
+        with caplog.at_level(logging.INFO, logger="server"):
+            request(index, "GET", "/health")
+    finally:
+        instrument.disable()
+    assert [r.getMessage().rsplit(" ", 2)[0] for r in caplog.records] == ["GET /health 200"]
+    assert metrics.to_dict()["request"]["calls"] == 1
@@ -0,0 +1,92 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from lookup import LookupIndex, ReadOnlyIndex
+from mapstore import MappedStore, write_store
+from sqlstore import SQLStore
+
+DOCS = [0.01, 0.05, 0.125, 0.25, 0.5, 1.0, 2.0]
+DIAMETERS = [0.01, 0.0625, 0.125, 0.25, 0.375, 0.5, 1.0, 3.0]
+
+
+@pytest.fixture(scope="module")
+def index(table):
+    return LookupIndex(table)
+
+
+@pytest.fixture(scope="module")
+def sql_store(merged_db):
+    store = SQLStore(merged_db)
+    yield store
+    store.close()
+
+
+def mapped(index, tmp_path):
+    path = str(tmp_path / "feeds.vsdb")
+    write_store(index, path)
+    return MappedStore(path)
+
+
+def assert_same_lookups(expected, store):
+    assert sorted(store.selections()) == sorted(expected.selections())
+    docs, diameters = np.meshgrid(DOCS, DIAMETERS)
+    for selection in expected.selections():
+        want = expected.feed_speed_batch(*selection, docs, diameters)
+        got = store.feed_speed_batch(*selection, docs, diameters)
+        np.testing.assert_array_equal(got[0], want[0])
+        np.testing.assert_array_equal(got[1], want[1])
+        for doc, diameter in [(0.1, 0.25), (5.0, 0.01)]:
+            assert store.feed_speed(*selection, doc, diameter) == \
+                expected.feed_speed(*selection, doc, diameter)
+            assert store.rows(*selection, doc, diameter) == expected.rows(*selection, doc, diameter)
+
+
+def test_mapped_store_matches_lookup_index(index, tmp_path):
+    store = mapped(index, tmp_path)
+    assert len(store) == sum(len(index.leaf(*s).source) for s in index.selections())
+    assert_same_lookups(index, store)
+
+
+def test_mapped_store_matches_every_bundled_sheet(sql_store, tmp_path):
+    assert_same_lookups(sql_store, mapped(sql_store, tmp_path))
+
+
+def test_mapped_store_keeps_any_doc_rows(sql_store, tmp_path):
+    store = mapped(sql_store, tmp_path)
+    leaf = store.leaf('wood', 'MDF', 'carbide', 'end mill')
+    assert leaf.source == sql_store.leaf('wood', 'MDF', 'carbide', 'end mill').source
+    assert any(doc is None for doc, _, _, _ in leaf.source)
+
+
+def test_stores_are_read_only(index, sql_store, tmp_path):
+    for store in (sql_store, mapped(index, tmp_path)):
+        assert isinstance(store, ReadOnlyIndex)
+        assert not isinstance(store, LookupIndex)
+        assert not hasattr(store, 'build')
+
+
+def test_lookup_index_reuses_leaves_of_a_store(table, tmp_path):
+    store = mapped(LookupIndex(table), tmp_path)
+    index = LookupIndex(table, previous=store)
+    assert index.rebuilt == 0
+
+
+def test_close_releases_the_store(index, merged_db, tmp_path):
+    store = mapped(index, tmp_path)
+    selection = next(iter(index.selections()))
+    store.feed_speed(*selection, 0.1, 0.25)
+    store.close()
+    assert store.map.closed
+
+    store = SQLStore(merged_db)
+    store.feed_speed(*selection, 0.1, 0.25)
+    store.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        store.families()
+
+
+def test_lookup_index_close_does_nothing(index):
+    index.close()
+    assert index.families()
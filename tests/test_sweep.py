@@ -0,0 +1,29 @@
+import sys
+
+import pytest
+
+import sweep
+
+
+def test_parquet_without_pyarrow_fails_before_running(monkeypatch, capsys, tmp_path):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setattr(sweep.cli, "load_index", lambda args: pytest.fail("index loaded"))
+    with pytest.raises(SystemExit) as exit:
+        sweep.main(["-o", str(tmp_path / "sweep.parquet")])
+    assert exit.value.code == 2
+    assert "pip install pyarrow" in capsys.readouterr().err
+    assert not (tmp_path / "sweep.parquet").exists()
+
+
+def test_csv_sweep(table, tmp_path):
+    from lookup import LookupIndex
+    from tool import Tool
+
+    tools = [Tool(0.25, 2, 'HSS', 'quarter'), Tool(0.5, 2, 'carbide', 'half')]
+    path = str(tmp_path / "sweep.csv")
+    rows = sweep.run_sweep(LookupIndex(table), sweep.Sweep(tools, docs=[0.1, 0.2]), path,
+                           family='wood', species='MDF', operation='end mill', workers=1)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == ",".join(sweep.COLUMNS)
+    assert len(lines) == rows + 1 == 5